@@ -2,18 +2,43 @@
 Admin routes for the Marseille Immobilier application
 """
 
-import os
+import json
 import uuid
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify
+import base64
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.security import check_password_hash, generate_password_hash
-from models import User, Agency, ContactMessage, Plan, CarouselSettings, CarouselItem, AgencyImage
+from models import User, Agency, ContactMessage, Plan, CarouselSettings, CarouselItem, AgencyImage, Translation
 from app import db
-from utils import get_translation, allowed_file, save_uploaded_file
+from cache import bump_generation, invalidate_pages, TRANSLATIONS_GENERATION
+from i18n import clear_catalog
+from exporter import EXPORT_FORMATS, export_filename, parse_date_range, stream_export
+from importer import IMPORT_CHUNK_SIZE, detect_format, import_agencies
+from jobs import submit_job, process_agency_image
+from ordering import SORT_GAP, apply_order, move_item, next_sort_order
+from stats import adjust_counters, get_stats
+from utils import get_translation, allowed_file, save_uploaded_file, release_uploaded_file, release_uploaded_files, apply_image_metadata, parse_id, parse_id_list, normalize_website
 
 admin_bp = Blueprint('admin', __name__)
 
+# Number of contact messages per inbox page
+MESSAGES_PAGE_SIZE = 20
+
+# Largest number of IDs accepted by one bulk operation
+BULK_MAX_IDS = 10000
+
+def invalidate_public_pages():
+    """Drop cached public pages in every worker once a content change is committed"""
+    try:
+        invalidate_pages()
+    except Exception as e:
+        # The change itself is saved; pages refresh at the latest on the next invalidation
+        current_app.logger.error(f"Error invalidating page cache: {e}")
+
 @admin_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Admin login page"""
@@ -56,22 +81,12 @@ def dashboard():
     """Admin dashboard"""
     language = session.get('language', 'fr')
     
-    # Get statistics
-    total_agencies = Agency.query.count()
-    active_agencies = Agency.query.filter_by(is_active=True).count()
-    total_messages = ContactMessage.query.count()
-    unread_messages = ContactMessage.query.filter_by(is_read=False).count()
+    # Counters are maintained by the write paths: one small query
+    stats = get_stats()
     
     # Get recent messages
     recent_messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).limit(5).all()
     
-    stats = {
-        'total_agencies': total_agencies,
-        'active_agencies': active_agencies,
-        'total_messages': total_messages,
-        'unread_messages': unread_messages
-    }
-    
     return render_template('admin/dashboard.html', 
                          language=language, 
                          stats=stats, 
@@ -82,7 +97,10 @@ def dashboard():
 def agencies():
     """List all agencies"""
     language = session.get('language', 'fr')
-    agencies = Agency.query.order_by(Agency.sort_order.asc()).all()
+    agencies = Agency.query.options(
+        joinedload(Agency.plan),
+        selectinload(Agency.images)
+    ).order_by(Agency.sort_order.asc()).all()
     return render_template('admin/agencies.html', language=language, agencies=agencies)
 
 @admin_bp.route('/agencies/add', methods=['GET', 'POST'])
@@ -94,7 +112,7 @@ def add_agency():
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
         city = request.form.get('city', '').strip()
-        website = request.form.get('website', '').strip()
+        website = normalize_website(request.form.get('website'))
         description = request.form.get('description', '').strip()
         plan_id = request.form.get('plan_id', type=int)
         
@@ -102,10 +120,6 @@ def add_agency():
             flash(get_translation('agency_error_required', language), 'error')
             return render_template('admin/agency_form.html', language=language)
         
-        # Ensure website has protocol
-        if not website.startswith(('http://', 'https://')):
-            website = 'https://' + website
-        
         # Handle file uploads
         logo_filename = None
         cover_filename = None
@@ -120,9 +134,6 @@ def add_agency():
             if cover_file and cover_file.filename and allowed_file(cover_file.filename):
                 cover_filename = save_uploaded_file(cover_file, 'covers')
         
-        # Get next sort order
-        max_order = db.session.query(db.func.max(Agency.sort_order)).scalar() or 0
-        
         agency = Agency()
         agency.name = name
         agency.city = city
@@ -131,11 +142,15 @@ def add_agency():
         agency.plan_id = plan_id
         agency.logo_filename = logo_filename
         agency.cover_filename = cover_filename
-        agency.sort_order = max_order + 1
+        agency.sort_order = next_sort_order(Agency)
+        apply_image_metadata(agency, logo_filename, 'logos', prefix='logo')
+        apply_image_metadata(agency, cover_filename, 'covers', prefix='cover')
         
         try:
             db.session.add(agency)
+            adjust_counters(total_agencies=1, active_agencies=1)
             db.session.commit()
+            invalidate_public_pages()
             flash(get_translation('agency_add_success', language), 'success')
             return redirect(url_for('admin.agencies'))
         except Exception as e:
@@ -154,9 +169,10 @@ def edit_agency(agency_id):
     agency = Agency.query.get_or_404(agency_id)
     
     if request.method == 'POST':
+        was_active = bool(agency.is_active)
         agency.name = request.form.get('name', '').strip()
         agency.city = request.form.get('city', '').strip()
-        agency.website = request.form.get('website', '').strip()
+        agency.website = normalize_website(request.form.get('website'))
         agency.description = request.form.get('description', '').strip()
         agency.plan_id = request.form.get('plan_id', type=int)
         agency.is_active = 'is_active' in request.form
@@ -166,51 +182,40 @@ def edit_agency(agency_id):
             plans = Plan.query.filter_by(is_active=True).order_by(Plan.name).all()
             return render_template('admin/agency_form.html', language=language, agency=agency, plans=plans)
         
-        # Ensure website has protocol
-        if not agency.website.startswith(('http://', 'https://')):
-            agency.website = 'https://' + agency.website
-        
         # Handle file uploads
         if 'logo' in request.files:
             logo_file = request.files['logo']
             if logo_file and logo_file.filename and allowed_file(logo_file.filename):
                 # Delete old logo if exists
-                if agency.logo_filename:
-                    old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'logos', agency.logo_filename)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
+                release_uploaded_file(agency.logo_filename, 'logos')
                 
                 agency.logo_filename = save_uploaded_file(logo_file, 'logos')
+                apply_image_metadata(agency, agency.logo_filename, 'logos', prefix='logo')
         
         if 'cover' in request.files:
             cover_file = request.files['cover']
             if cover_file and cover_file.filename and allowed_file(cover_file.filename):
                 # Delete old cover if exists
-                if agency.cover_filename:
-                    old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'covers', agency.cover_filename)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
+                release_uploaded_file(agency.cover_filename, 'covers')
                 
                 agency.cover_filename = save_uploaded_file(cover_file, 'covers')
+                apply_image_metadata(agency, agency.cover_filename, 'covers', prefix='cover')
         
         # Handle multiple gallery images
+        failed = []
         if 'gallery_images' in request.files:
-            gallery_files = request.files.getlist('gallery_images')
-            for gallery_file in gallery_files:
-                if gallery_file and gallery_file.filename and allowed_file(gallery_file.filename):
-                    image_filename = save_uploaded_file(gallery_file, 'agencies')
-                    if image_filename:
-                        # Create AgencyImage record
-                        agency_image = AgencyImage()
-                        agency_image.agency_id = agency.id
-                        agency_image.image_filename = image_filename
-                        agency_image.alt_text = f"Imagen de {agency.name}"
-                        agency_image.sort_order = len(agency.images)
-                        db.session.add(agency_image)
+            _, failed = insert_gallery_images(
+                agency, request.files.getlist('gallery_images'), f"Imagen de {agency.name}"
+            )
         
         try:
+            adjust_counters(active_agencies=int(agency.is_active) - int(was_active))
             db.session.commit()
+            invalidate_public_pages()
+            queue_pending_images(agency.id)
             flash(get_translation('agency_edit_success', language), 'success')
+            if failed:
+                flash(f'{len(failed)} imagen(es) no se pudieron agregar: {", ".join(failed)}', 'warning')
             return redirect(url_for('admin.agencies'))
         except Exception as e:
             db.session.rollback()
@@ -228,19 +233,9 @@ def delete_agency(agency_id):
     agency = Agency.query.get_or_404(agency_id)
     
     try:
-        # Delete associated files
-        if agency.logo_filename:
-            logo_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'logos', agency.logo_filename)
-            if os.path.exists(logo_path):
-                os.remove(logo_path)
-        
-        if agency.cover_filename:
-            cover_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'covers', agency.cover_filename)
-            if os.path.exists(cover_path):
-                os.remove(cover_path)
-        
-        db.session.delete(agency)
+        delete_agencies([agency.id])
         db.session.commit()
+        invalidate_public_pages()
         flash(get_translation('agency_delete_success', language), 'success')
     except Exception as e:
         db.session.rollback()
@@ -249,46 +244,245 @@ def delete_agency(agency_id):
     
     return redirect(url_for('admin.agencies'))
 
+def delete_agencies(agency_ids):
+    """Delete agencies and their gallery images with set-based statements
+    
+    Their files are released in batches and the dashboard counters adjusted.
+    Returns the number of agencies deleted; the caller commits.
+    """
+    image_filenames = db.session.execute(
+        db.select(AgencyImage.image_filename).where(AgencyImage.agency_id.in_(agency_ids))
+    ).scalars().all()
+    db.session.execute(
+        db.delete(AgencyImage).where(AgencyImage.agency_id.in_(agency_ids)),
+        execution_options={'synchronize_session': False}
+    )
+    deleted = db.session.execute(
+        db.delete(Agency).where(Agency.id.in_(agency_ids))
+        .returning(Agency.is_active, Agency.logo_filename, Agency.cover_filename),
+        execution_options={'synchronize_session': False}
+    ).all()
+    
+    files = [('agencies', filename) for filename in image_filenames]
+    for _, logo_filename, cover_filename in deleted:
+        files += [('logos', logo_filename), ('covers', cover_filename)]
+    release_uploaded_files(files)
+    
+    adjust_counters(
+        total_agencies=-len(deleted),
+        active_agencies=-sum(1 for is_active, _, _ in deleted if is_active)
+    )
+    return len(deleted)
+
+@admin_bp.route('/agencies/bulk', methods=['POST'])
+@login_required
+def bulk_agencies():
+    """Activate, deactivate or delete a list of agencies in one transaction"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    action = data.get('action')
+    try:
+        agency_ids = parse_id_list(data.get('agency_ids'))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
+    if action not in ('activate', 'deactivate', 'delete') or not agency_ids or len(agency_ids) > BULK_MAX_IDS:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
+    try:
+        if action == 'delete':
+            count = delete_agencies(agency_ids)
+        else:
+            is_active = action == 'activate'
+            count = db.session.execute(
+                db.update(Agency)
+                .where(Agency.id.in_(agency_ids), Agency.is_active.isnot(is_active))
+                .values(is_active=is_active),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            adjust_counters(active_agencies=count if is_active else -count)
+        
+        db.session.commit()
+        invalidate_public_pages()
+        return jsonify({'status': 'success', 'count': count})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in bulk agency {action}: {e}")
+        return jsonify({'status': 'error'}), 500
+
+@admin_bp.route('/agencies/import', methods=['POST'])
+@login_required
+def import_agencies_file():
+    """Import agencies from an uploaded CSV or JSON Lines file"""
+    file = request.files.get('file')
+    file_format = detect_format(file.filename if file else None)
+    if not file_format:
+        flash('Seleccione un archivo CSV o JSON Lines', 'error')
+        return redirect(url_for('admin.agencies'))
+    
+    def log_progress(report):
+        current_app.logger.info(f"Agency import {file.filename}: {report['imported']} imported, {report['failed']} rejected")
+    
+    try:
+        # The upload is read as a stream: Werkzeug spools large files to disk
+        report = import_agencies(file.stream, file_format, IMPORT_CHUNK_SIZE, progress=log_progress)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error importing agencies from {file.filename}: {e}")
+        # Chunks committed before the error are kept
+        invalidate_public_pages()
+        flash('Error al importar las agencias', 'error')
+        return redirect(url_for('admin.agencies'))
+    
+    if report['imported']:
+        invalidate_public_pages()
+    flash(f"{report['imported']} agencia(s) importada(s), {report['failed']} línea(s) rechazada(s)",
+          'success' if not report['failed'] else 'warning')
+    for line_number, error in report['errors'][:10]:
+        flash(f"Línea {line_number}: {error}", 'error')
+    return redirect(url_for('admin.agencies'))
+
+def export_response(kind, redirect_endpoint):
+    """Stream an export selected by the format, start, end and gzip query arguments"""
+    file_format = request.args.get('format', 'csv')
+    compress = request.args.get('gzip', type=int) == 1
+    try:
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format {file_format}")
+        start, end = parse_date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        flash('Parámetros de exportación no válidos', 'error')
+        return redirect(url_for(redirect_endpoint))
+    
+    # stream_with_context keeps the database session open while rows are sent
+    response = Response(
+        stream_with_context(stream_export(kind, file_format, start, end, compress)),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[file_format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(kind, file_format, compress)}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@admin_bp.route('/agencies/export')
+@login_required
+def export_agencies():
+    """Download agencies as CSV or JSON Lines"""
+    return export_response('agencies', 'admin.agencies')
+
+def read_reorder_request(ids_field):
+    """Read a reorder body: {'move_id', 'before_id'} for one row, or {ids_field: [...]} for all
+
+    Returns (move_id, before_id, ids) with only the fields of the sent form
+    set; raises ValueError for anything but a JSON object of integer IDs.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    if 'move_id' in data:
+        before_id = data.get('before_id')
+        return parse_id(data['move_id']), None if before_id is None else parse_id(before_id), None
+    return None, None, parse_id_list(data.get(ids_field))
+
 @admin_bp.route('/agencies/reorder', methods=['POST'])
 @login_required
 def reorder_agencies():
-    """Reorder agencies via AJAX"""
+    """Reorder agencies via AJAX: the full list, or one agency moved before another"""
     try:
-        agency_ids = request.get_json().get('agency_ids', [])
-        
-        for index, agency_id in enumerate(agency_ids):
-            agency = Agency.query.get(agency_id)
-            if agency:
-                agency.sort_order = index
+        move_id, before_id, ids = read_reorder_request('agency_ids')
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
+    try:
+        if move_id is not None:
+            if not move_item(Agency, move_id, before_id):
+                return jsonify({'status': 'error'}), 404
+        else:
+            apply_order(Agency, ids)
         
         db.session.commit()
+        invalidate_public_pages()
         return jsonify({'status': 'success'})
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error reordering agencies: {e}")
         return jsonify({'status': 'error'}), 500
 
+def encode_message_cursor(message):
+    """Encode the inbox position of a message as an opaque cursor token"""
+    position = [message.created_at.isoformat(), message.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_message_cursor(token):
+    """Decode a message cursor token, raising ValueError if it is malformed"""
+    try:
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
 @admin_bp.route('/messages')
 @login_required
 def messages():
-    """View contact messages"""
+    """View contact messages, newest first
+    
+    Pages are selected with a keyset condition on (created_at, id) rather
+    than an OFFSET, so every page costs the same; the totals come from the
+    dashboard counters instead of a COUNT query.
+    """
     language = session.get('language', 'fr')
-    page = request.args.get('page', 1, type=int)
+    unread_only = request.args.get('unread', type=int) == 1
+    cursor = request.args.get('cursor')
     
-    messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    query = ContactMessage.query
+    if unread_only:
+        query = query.filter(ContactMessage.is_read == False)
+    
+    if cursor:
+        try:
+            created_at, message_id = decode_message_cursor(cursor)
+        except ValueError:
+            return redirect(url_for('admin.messages', unread=1 if unread_only else None))
+        query = query.filter(or_(
+            ContactMessage.created_at < created_at,
+            and_(ContactMessage.created_at == created_at, ContactMessage.id < message_id)
+        ))
+    
+    rows = query.order_by(ContactMessage.created_at.desc(), ContactMessage.id.desc()).limit(MESSAGES_PAGE_SIZE + 1).all()
+    messages = rows[:MESSAGES_PAGE_SIZE]
+    next_cursor = encode_message_cursor(messages[-1]) if len(rows) > MESSAGES_PAGE_SIZE else None
     
-    return render_template('admin/messages.html', language=language, messages=messages)
+    stats = get_stats()
+    
+    return render_template('admin/messages.html', 
+                         language=language, 
+                         messages=messages, 
+                         next_cursor=next_cursor, 
+                         unread_only=unread_only, 
+                         total_messages=stats['unread_messages' if unread_only else 'total_messages'], 
+                         unread_messages=stats['unread_messages'])
+
+@admin_bp.route('/messages/export')
+@login_required
+def export_messages():
+    """Download contact messages as CSV or JSON Lines"""
+    return export_response('messages', 'admin.messages')
 
 @admin_bp.route('/messages/mark-read/<int:message_id>', methods=['POST'])
 @login_required
 def mark_message_read(message_id):
     """Mark message as read"""
     message = ContactMessage.query.get_or_404(message_id)
-    message.is_read = True
     
     try:
+        # Conditional update, so concurrent clicks only count the message once
+        result = db.session.execute(
+            db.update(ContactMessage)
+            .where(ContactMessage.id == message.id, ContactMessage.is_read.is_(False))
+            .values(is_read=True)
+        )
+        if result.rowcount:
+            adjust_counters(unread_messages=-1)
         db.session.commit()
         return jsonify({'status': 'success'})
     except Exception as e:
@@ -296,6 +490,52 @@ def mark_message_read(message_id):
         current_app.logger.error(f"Error marking message as read: {e}")
         return jsonify({'status': 'error'}), 500
 
+@admin_bp.route('/messages/bulk', methods=['POST'])
+@login_required
+def bulk_messages():
+    """Mark read, mark unread or delete a list of messages in one transaction"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    action = data.get('action')
+    try:
+        message_ids = parse_id_list(data.get('message_ids'))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
+    if action not in ('mark_read', 'mark_unread', 'delete') or not message_ids or len(message_ids) > BULK_MAX_IDS:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
+    try:
+        if action == 'delete':
+            deleted = db.session.execute(
+                db.delete(ContactMessage).where(ContactMessage.id.in_(message_ids))
+                .returning(ContactMessage.is_read),
+                execution_options={'synchronize_session': False}
+            ).scalars().all()
+            count = len(deleted)
+            adjust_counters(
+                total_messages=-count,
+                unread_messages=-sum(1 for is_read in deleted if is_read is False)
+            )
+        else:
+            is_read = action == 'mark_read'
+            # Only rows whose state changes are counted
+            count = db.session.execute(
+                db.update(ContactMessage)
+                .where(ContactMessage.id.in_(message_ids), ContactMessage.is_read.is_(not is_read))
+                .values(is_read=is_read),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            adjust_counters(unread_messages=-count if is_read else count)
+        
+        db.session.commit()
+        return jsonify({'status': 'success', 'count': count})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in bulk message {action}: {e}")
+        return jsonify({'status': 'error'}), 500
+
 # Carousel Management Routes
 @admin_bp.route('/carousel')
 @login_required
@@ -343,15 +583,13 @@ def update_carousel_settings():
             if '.' in video_file.filename and \
                video_file.filename.rsplit('.', 1)[1].lower() in allowed_video_extensions:
                 # Delete old video if exists
-                if settings.video_filename:
-                    old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'carousel', settings.video_filename)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
+                release_uploaded_file(settings.video_filename, 'carousel')
                 
                 settings.video_filename = save_uploaded_file(video_file, 'carousel')
     
     try:
         db.session.commit()
+        invalidate_public_pages()
         flash('Configuración del carrusel actualizada exitosamente', 'success')
     except Exception as e:
         db.session.rollback()
@@ -388,13 +626,15 @@ def add_carousel_item():
     # Create carousel item
     item = CarouselItem()
     item.image_filename = image_filename
+    apply_image_metadata(item, image_filename, 'carousel')
     item.link_url = request.form.get('link_url', '').strip()
     item.alt_text = request.form.get('alt_text', '').strip()
-    item.sort_order = CarouselItem.query.count()
+    item.sort_order = next_sort_order(CarouselItem)
     
     try:
         db.session.add(item)
         db.session.commit()
+        invalidate_public_pages()
         flash('Imagen agregada al carrusel exitosamente', 'success')
     except Exception as e:
         db.session.rollback()
@@ -411,13 +651,11 @@ def delete_carousel_item(item_id):
     
     try:
         # Delete image file
-        if item.image_filename:
-            image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'carousel', item.image_filename)
-            if os.path.exists(image_path):
-                os.remove(image_path)
+        release_uploaded_file(item.image_filename, 'carousel')
         
         db.session.delete(item)
         db.session.commit()
+        invalidate_public_pages()
         flash('Imagen eliminada del carrusel exitosamente', 'success')
     except Exception as e:
         db.session.rollback()
@@ -435,6 +673,7 @@ def toggle_carousel_item(item_id):
     
     try:
         db.session.commit()
+        invalidate_public_pages()
         status = 'activada' if item.is_active else 'desactivada'
         flash(f'Imagen {status} exitosamente', 'success')
     except Exception as e:
@@ -447,16 +686,21 @@ def toggle_carousel_item(item_id):
 @admin_bp.route('/carousel/reorder', methods=['POST'])
 @login_required
 def reorder_carousel():
-    """Reorder carousel items via AJAX"""
+    """Reorder carousel items via AJAX: the full list, or one item moved before another"""
     try:
-        item_ids = request.get_json().get('item_ids', [])
-        
-        for index, item_id in enumerate(item_ids):
-            item = CarouselItem.query.get(item_id)
-            if item:
-                item.sort_order = index
+        move_id, before_id, ids = read_reorder_request('item_ids')
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
+    try:
+        if move_id is not None:
+            if not move_item(CarouselItem, move_id, before_id):
+                return jsonify({'status': 'error'}), 404
+        else:
+            apply_order(CarouselItem, ids)
         
         db.session.commit()
+        invalidate_public_pages()
         return jsonify({'status': 'success'})
     except Exception as e:
         db.session.rollback()
@@ -488,29 +732,17 @@ def add_agency_images(agency_id):
         flash('No se seleccionaron imágenes', 'error')
         return redirect(url_for('admin.agency_images', agency_id=agency_id))
     
-    images = request.files.getlist('images')
-    added_count = 0
-    
-    for image_file in images:
-        if image_file and image_file.filename and allowed_file(image_file.filename):
-            image_filename = save_uploaded_file(image_file, 'agencies')
-            if image_filename:
-                agency_image = AgencyImage()
-                agency_image.agency_id = agency_id
-                agency_image.image_filename = image_filename
-                agency_image.alt_text = request.form.get('alt_text', f'Imagen de {agency.name}')
-                agency_image.sort_order = AgencyImage.query.filter_by(agency_id=agency_id).count()
-                
-                # Set as primary if it's the first image
-                if not agency.images:
-                    agency_image.is_primary = True
-                
-                db.session.add(agency_image)
-                added_count += 1
+    added_count, failed = insert_gallery_images(
+        agency, request.files.getlist('images'), request.form.get('alt_text', f'Imagen de {agency.name}')
+    )
+    if failed:
+        flash(f'{len(failed)} imagen(es) no se pudieron agregar: {", ".join(failed)}', 'warning')
     
     if added_count > 0:
         try:
             db.session.commit()
+            invalidate_public_pages()
+            queue_pending_images(agency_id)
             flash(f'{added_count} imagen(es) agregada(s) exitosamente', 'success')
         except Exception as e:
             db.session.rollback()
@@ -521,6 +753,75 @@ def add_agency_images(agency_id):
     
     return redirect(url_for('admin.agency_images', agency_id=agency_id))
 
+@admin_bp.route('/agency/<int:agency_id>/images/status')
+@login_required
+def agency_images_status(agency_id):
+    """Processing status of agency images, polled by the admin UI"""
+    rows = db.session.execute(
+        db.select(AgencyImage.id, AgencyImage.processing_status)
+        .where(AgencyImage.agency_id == agency_id)
+        .order_by(AgencyImage.sort_order.asc())
+    ).all()
+    
+    return jsonify({
+        'status': 'success',
+        'images': [{'id': image_id, 'processing_status': status} for image_id, status in rows],
+        'pending': sum(1 for _, status in rows if status == 'pending')
+    })
+
+def insert_gallery_images(agency, files, alt_text):
+    """Store uploaded gallery files and insert their rows in a single statement
+    
+    Positions follow the agency's last image and the first new image becomes
+    primary when the agency has none. Files that are rejected or fail to save
+    are skipped. Returns the number of images added and the names of the
+    files that failed; the caller commits.
+    """
+    last_order, has_primary = db.session.execute(
+        db.select(
+            db.func.max(AgencyImage.sort_order),
+            db.func.max(db.case((AgencyImage.is_primary, 1), else_=0))
+        ).where(AgencyImage.agency_id == agency.id)
+    ).one()
+    
+    rows = []
+    failed = []
+    for image_file in files:
+        # Browsers send an empty part when no file was picked
+        if not image_file or not image_file.filename:
+            continue
+        
+        image_filename = None
+        if allowed_file(image_file.filename):
+            image_filename = save_uploaded_file(image_file, 'agencies', with_variants=False)
+        if not image_filename:
+            failed.append(image_file.filename)
+            continue
+        
+        rows.append({
+            'agency_id': agency.id,
+            'image_filename': image_filename,
+            'alt_text': alt_text,
+            'sort_order': (last_order or 0) + SORT_GAP * (len(rows) + 1),
+            'is_primary': not has_primary and not rows,
+            'processing_status': 'pending'
+        })
+    
+    if rows:
+        db.session.execute(db.insert(AgencyImage), rows)
+    return len(rows), failed
+
+def queue_pending_images(agency_id):
+    """Queue variant generation for the pending images of an agency"""
+    pending_ids = db.session.execute(
+        db.select(AgencyImage.id).where(
+            AgencyImage.agency_id == agency_id,
+            AgencyImage.processing_status == 'pending'
+        )
+    ).scalars().all()
+    for image_id in pending_ids:
+        submit_job(process_agency_image, image_id)
+
 @admin_bp.route('/agency/image/<int:image_id>/delete', methods=['POST'])
 @login_required
 def delete_agency_image(image_id):
@@ -530,13 +831,11 @@ def delete_agency_image(image_id):
     
     try:
         # Delete image file
-        if image.image_filename:
-            image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'agencies', image.image_filename)
-            if os.path.exists(image_path):
-                os.remove(image_path)
+        release_uploaded_file(image.image_filename, 'agencies')
         
         db.session.delete(image)
         db.session.commit()
+        invalidate_public_pages()
         flash('Imagen eliminada exitosamente', 'success')
     except Exception as e:
         db.session.rollback()
@@ -559,6 +858,7 @@ def set_primary_agency_image(image_id):
         # Set this image as primary
         image.is_primary = True
         db.session.commit()
+        invalidate_public_pages()
         flash('Imagen principal actualizada', 'success')
     except Exception as e:
         db.session.rollback()
@@ -570,16 +870,23 @@ def set_primary_agency_image(image_id):
 @admin_bp.route('/agency/<int:agency_id>/images/reorder', methods=['POST'])
 @login_required
 def reorder_agency_images(agency_id):
-    """Reorder agency images via AJAX"""
+    """Reorder agency images via AJAX: the full list, or one image moved before another"""
+    try:
+        move_id, before_id, ids = read_reorder_request('image_ids')
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid request'}), 400
+    
     try:
-        image_ids = request.get_json().get('image_ids', [])
+        scope = [AgencyImage.agency_id == agency_id]
         
-        for index, image_id in enumerate(image_ids):
-            image = AgencyImage.query.get(image_id)
-            if image and image.agency_id == agency_id:
-                image.sort_order = index
+        if move_id is not None:
+            if not move_item(AgencyImage, move_id, before_id, scope):
+                return jsonify({'status': 'error'}), 404
+        else:
+            apply_order(AgencyImage, ids, scope)
         
         db.session.commit()
+        invalidate_public_pages()
         return jsonify({'status': 'success'})
     except Exception as e:
         db.session.rollback()
@@ -592,7 +899,7 @@ def reorder_agency_images(agency_id):
 def plans():
     """List all plans"""
     language = session.get('language', 'fr')
-    plans = Plan.query.order_by(Plan.name.asc()).all()
+    plans = Plan.query.order_by(Plan.tier.desc(), Plan.name.asc()).all()
     return render_template('admin/plans.html', language=language, plans=plans)
 
 @admin_bp.route('/plans/add', methods=['GET', 'POST'])
@@ -606,6 +913,7 @@ def add_plan():
         price = request.form.get('price', type=float)
         billing_period = request.form.get('billing_period', 'monthly')
         description = request.form.get('description', '').strip()
+        tier = request.form.get('tier', 0, type=int)
         
         if not name or price is None:
             flash(get_translation('plan_error_required', language), 'error')
@@ -622,10 +930,12 @@ def add_plan():
         plan.price = price
         plan.billing_period = billing_period
         plan.description = description
+        plan.tier = tier
         
         try:
             db.session.add(plan)
             db.session.commit()
+            invalidate_public_pages()
             flash(get_translation('plan_add_success', language), 'success')
             return redirect(url_for('admin.plans'))
         except Exception as e:
@@ -647,6 +957,7 @@ def edit_plan(plan_id):
         price = request.form.get('price', type=float)
         billing_period = request.form.get('billing_period', 'monthly')
         description = request.form.get('description', '').strip()
+        tier = request.form.get('tier', plan.tier, type=int)
         is_active = 'is_active' in request.form
         
         if not name or price is None:
@@ -663,10 +974,12 @@ def edit_plan(plan_id):
         plan.price = price
         plan.billing_period = billing_period
         plan.description = description
+        plan.tier = tier
         plan.is_active = is_active
         
         try:
             db.session.commit()
+            invalidate_public_pages()
             flash(get_translation('plan_edit_success', language), 'success')
             return redirect(url_for('admin.plans'))
         except Exception as e:
@@ -692,6 +1005,7 @@ def delete_plan(plan_id):
     try:
         db.session.delete(plan)
         db.session.commit()
+        invalidate_public_pages()
         flash(get_translation('plan_delete_success', language), 'success')
     except Exception as e:
         db.session.rollback()
@@ -700,6 +1014,70 @@ def delete_plan(plan_id):
     
     return redirect(url_for('admin.plans'))
 
+# Translations management routes
+@admin_bp.route('/translations')
+@login_required
+def translations():
+    """List database translations for one language"""
+    language = session.get('language', 'fr')
+    edit_language = request.args.get('lang', language)
+    
+    translations = Translation.query.filter_by(language=edit_language).order_by(Translation.key.asc()).all()
+    
+    return render_template('admin/translations.html', 
+                         language=language, 
+                         edit_language=edit_language, 
+                         translations=translations)
+
+@admin_bp.route('/translations/update', methods=['POST'])
+@login_required
+def update_translations():
+    """Create or update database translations for one language via AJAX"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error'}), 400
+        edit_language = data.get('language')
+        values = data.get('translations')
+        
+        if not isinstance(edit_language, str) or not isinstance(values, dict) or not values:
+            return jsonify({'status': 'error'}), 400
+        edit_language = edit_language.strip()
+        max_key_length = Translation.__table__.c.key.type.length
+        if not edit_language or len(edit_language) > Translation.__table__.c.language.type.length:
+            return jsonify({'status': 'error'}), 400
+        if any(not key or len(key) > max_key_length for key in values):
+            return jsonify({'status': 'error', 'message': f'Keys must be 1 to {max_key_length} characters'}), 400
+        
+        # Load every existing row of the batch in one query
+        existing = {
+            translation.key: translation
+            for translation in Translation.query.filter(
+                Translation.language == edit_language,
+                Translation.key.in_(list(values))
+            )
+        }
+        
+        for key, value in values.items():
+            translation = existing.get(key)
+            if translation is None:
+                translation = Translation()
+                translation.key = key
+                translation.language = edit_language
+                db.session.add(translation)
+            translation.value = str(value)
+        
+        # Other workers reload their catalog when they see the new generation
+        bump_generation(TRANSLATIONS_GENERATION)
+        db.session.commit()
+        invalidate_public_pages()
+        clear_catalog()
+        return jsonify({'status': 'success', 'updated': len(values)})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error updating translations: {e}")
+        return jsonify({'status': 'error'}), 500
+
 # Template context processors for admin
 @admin_bp.route('/password-change', methods=['GET', 'POST'])
 @login_required
@@ -742,15 +1120,3 @@ def password_change():
             return render_template('admin/password_change.html')
     
     return render_template('admin/password_change.html')
-
-
-@admin_bp.app_context_processor
-def inject_admin_globals():
-    """Inject admin-specific global variables into templates"""
-    from utils import get_translation, get_available_languages
-    language = session.get('language', 'fr')
-    return {
-        'get_translation': get_translation,
-        'current_language': language,
-        'available_languages': get_available_languages()
-    }
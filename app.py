@@ -43,6 +43,35 @@ app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'your-
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024  # 32MB max file size
 
+# Where uploads are stored: 'local' (UPLOAD_FOLDER) or 's3' (any S3-compatible service, requires boto3)
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local')
+app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET')
+app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL')
+app.config['S3_REGION'] = os.environ.get('S3_REGION')
+app.config['S3_ACCESS_KEY_ID'] = os.environ.get('S3_ACCESS_KEY_ID')
+app.config['S3_SECRET_ACCESS_KEY'] = os.environ.get('S3_SECRET_ACCESS_KEY')
+app.config['S3_PUBLIC_URL'] = os.environ.get('S3_PUBLIC_URL')
+
+# Offload /uploads bytes to a front proxy: X-Accel-Redirect internal location (nginx) or X-Sendfile
+app.config['UPLOAD_ACCEL_REDIRECT'] = os.environ.get('UPLOAD_ACCEL_REDIRECT')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', 'False').lower() in ['true', '1', 'yes']
+
+# Orphaned upload collection: seconds between runs (0 = CLI only), grace period, and
+# whether orphans are moved to uploads/.quarantine instead of being deleted
+app.config['STORAGE_GC_INTERVAL'] = int(os.environ.get('STORAGE_GC_INTERVAL', 0))
+app.config['STORAGE_GC_MIN_AGE'] = int(os.environ.get('STORAGE_GC_MIN_AGE', 3600))
+app.config['STORAGE_GC_QUARANTINE'] = os.environ.get('STORAGE_GC_QUARANTINE', 'False').lower() in ['true', '1', 'yes']
+
+# Threads per worker process for image processing (0 = process inside the request)
+app.config['BACKGROUND_WORKERS'] = int(os.environ.get('BACKGROUND_WORKERS', 2))
+
+# Translation source: 'files' (JSON files / compiled bundle) or 'database' (Translation table)
+app.config['TRANSLATION_BACKEND'] = os.environ.get('TRANSLATION_BACKEND', 'files')
+
+# Seconds between two reads of the cache generation table in each worker (0 = every request)
+app.config['CACHE_GENERATION_CHECK_INTERVAL'] = float(os.environ.get('CACHE_GENERATION_CHECK_INTERVAL', 1.0))
+
 # initialize the app with the extension, flask-sqlalchemy >= 3.0.x
 db.init_app(app)
 
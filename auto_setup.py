@@ -6,10 +6,316 @@ This module handles automatic initialization of the application
 import os
 import json
 import logging
+from flask import current_app
 from models import User, Agency, Translation, Plan
 from app import db
+from cache import bump_generation, TRANSLATIONS_GENERATION
+from search import ensure_search_index
+from stats import adjust_counters
 from utils import create_directories
 
+# Default translations for all languages
+DEFAULT_TRANSLATIONS = {
+    'fr': {
+        # Navigation
+        'nav_home': 'Accueil',
+        'nav_contact': 'Contact',
+        'nav_admin': 'Administration',
+        'nav_language': 'Langue',
+        
+        # Homepage
+        'site_title': 'Marseille Immobilier',
+        'site_subtitle': 'Tous les portails en un seul endroit - Annuaire Immobilier',
+        'hero_title': 'Trouvez votre agence immobilière à Marseille',
+        'hero_subtitle': 'Découvrez les meilleures agences immobilières de la région marseillaise',
+        'agencies_title': 'Nos Agences Partenaires',
+        'agency_visit': 'Visiter le site',
+        'pricing_title': 'Nos Tarifs',
+        'pricing_subtitle': 'Choisissez le plan qui vous convient',
+        'plan_basic': 'Basic',
+        'plan_premium': 'Premium',
+        'plan_basic_price': '99€/an',
+        'plan_premium_price': '199€/an',
+        'plan_basic_features': 'Fiche agence standard\nLien vers votre site\nSupport email',
+        'plan_premium_features': 'Fiche agence mise en avant\nLogo et images personnalisés\nSupport prioritaire\nStatistiques de visite',
+        'plan_contact': 'Nous contacter',
+        
+        # Contact
+        'contact_title': 'Contactez-nous',
+        'contact_subtitle': 'Une question ? Un projet ? N\'hésitez pas à nous écrire',
+        'contact_name': 'Nom complet',
+        'contact_email': 'Email',
+        'contact_phone': 'Téléphone',
+        'contact_subject': 'Sujet',
+        'contact_message': 'Message',
+        'contact_send': 'Envoyer',
+        'contact_success': 'Votre message a été envoyé avec succès !',
+        'contact_error_required': 'Veuillez remplir tous les champs obligatoires.',
+        'contact_error_save': 'Erreur lors de l\'enregistrement du message.',
+        'contact_email_error': 'Message enregistré mais erreur lors de l\'envoi de l\'email.',
+        
+        # Admin
+        'admin_login': 'Connexion Admin',
+        'admin_username': 'Nom d\'utilisateur',
+        'admin_password': 'Mot de passe',
+        'admin_login_btn': 'Se connecter',
+        'admin_dashboard': 'Tableau de bord',
+        'admin_agencies': 'Agences',
+        'admin_messages': 'Messages',
+        'admin_logout': 'Déconnexion',
+        'login_error_required': 'Nom d\'utilisateur et mot de passe requis.',
+        'login_error_invalid': 'Identifiants invalides.',
+        'logout_success': 'Déconnexion réussie.',
+        
+        # Agencies management
+        'agencies_add': 'Ajouter une agence',
+        'agencies_edit': 'Modifier',
+        'agencies_delete': 'Supprimer',
+        'agency_name': 'Nom de l\'agence',
+        'agency_city': 'Ville',
+        'agency_website': 'Site web',
+        'agency_description': 'Description',
+        'agency_logo': 'Logo',
+        'agency_cover': 'Image de couverture',
+        'agency_plan': 'Plan',
+        'agency_active': 'Agence active',
+        'agency_save': 'Enregistrer',
+        'agency_cancel': 'Annuler',
+        'agency_add_success': 'Agence ajoutée avec succès.',
+        'agency_edit_success': 'Agence modifiée avec succès.',
+        'agency_delete_success': 'Agence supprimée avec succès.',
+        'agency_error_required': 'Nom, ville et site web sont obligatoires.',
+        'agency_error_save': 'Erreur lors de l\'enregistrement.',
+        'agency_error_delete': 'Erreur lors de la suppression.',
+        
+        # Footer
+        'footer_privacy': 'Politique de confidentialité',
+        'footer_copyright': '© 2024 Marseille Immobilier. Tous droits réservés.',
+        
+        # Privacy
+        'privacy_title': 'Politique de confidentialité',
+        'privacy_content': 'Cette page décrit notre politique de confidentialité...'
+    },
+    'en': {
+        # Navigation
+        'nav_home': 'Home',
+        'nav_contact': 'Contact',
+        'nav_admin': 'Admin',
+        'nav_language': 'Language',
+        
+        # Homepage
+        'site_title': 'Marseille Real Estate',
+        'site_subtitle': 'All portals in one place - Real Estate Directory',
+        'hero_title': 'Find your real estate agency in Marseille',
+        'hero_subtitle': 'Discover the best real estate agencies in the Marseille region',
+        'agencies_title': 'Our Partner Agencies',
+        'agency_visit': 'Visit website',
+        'pricing_title': 'Our Pricing',
+        'pricing_subtitle': 'Choose the plan that suits you',
+        'plan_basic': 'Basic',
+        'plan_premium': 'Premium',
+        'plan_basic_price': '€99/year',
+        'plan_premium_price': '€199/year',
+        'plan_basic_features': 'Standard agency listing\nLink to your website\nEmail support',
+        'plan_premium_features': 'Featured agency listing\nCustom logo and images\nPriority support\nVisit statistics',
+        'plan_contact': 'Contact us',
+        
+        # Contact
+        'contact_title': 'Contact us',
+        'contact_subtitle': 'A question? A project? Don\'t hesitate to write to us',
+        'contact_name': 'Full name',
+        'contact_email': 'Email',
+        'contact_phone': 'Phone',
+        'contact_subject': 'Subject',
+        'contact_message': 'Message',
+        'contact_send': 'Send',
+        'contact_success': 'Your message has been sent successfully!',
+        'contact_error_required': 'Please fill in all required fields.',
+        'contact_error_save': 'Error saving the message.',
+        'contact_email_error': 'Message saved but error sending email.',
+        
+        # Admin
+        'admin_login': 'Admin Login',
+        'admin_username': 'Username',
+        'admin_password': 'Password',
+        'admin_login_btn': 'Login',
+        'admin_dashboard': 'Dashboard',
+        'admin_agencies': 'Agencies',
+        'admin_messages': 'Messages',
+        'admin_logout': 'Logout',
+        'login_error_required': 'Username and password required.',
+        'login_error_invalid': 'Invalid credentials.',
+        'logout_success': 'Successfully logged out.',
+        
+        # Agencies management
+        'agencies_add': 'Add agency',
+        'agencies_edit': 'Edit',
+        'agencies_delete': 'Delete',
+        'agency_name': 'Agency name',
+        'agency_city': 'City',
+        'agency_website': 'Website',
+        'agency_description': 'Description',
+        'agency_logo': 'Logo',
+        'agency_cover': 'Cover image',
+        'agency_plan': 'Plan',
+        'agency_active': 'Active agency',
+        'agency_save': 'Save',
+        'agency_cancel': 'Cancel',
+        'agency_add_success': 'Agency added successfully.',
+        'agency_edit_success': 'Agency updated successfully.',
+        'agency_delete_success': 'Agency deleted successfully.',
+        'agency_error_required': 'Name, city and website are required.',
+        'agency_error_save': 'Error saving the agency.',
+        'agency_error_delete': 'Error deleting the agency.',
+        
+        # Footer
+        'footer_privacy': 'Privacy Policy',
+        'footer_copyright': '© 2024 Marseille Real Estate. All rights reserved.',
+        
+        # Privacy
+        'privacy_title': 'Privacy Policy',
+        'privacy_content': 'This page describes our privacy policy...'
+    },
+    'it': {
+        # Navigation
+        'nav_home': 'Home',
+        'nav_contact': 'Contatto',
+        'nav_admin': 'Admin',
+        'nav_language': 'Lingua',
+        
+        # Homepage
+        'site_title': 'Immobiliare Marsiglia',
+        'site_subtitle': 'Tutti i portali in un unico posto - Elenco Immobiliare',
+        'hero_title': 'Trova la tua agenzia immobiliare a Marsiglia',
+        'hero_subtitle': 'Scopri le migliori agenzie immobiliari della regione di Marsiglia',
+        'agencies_title': 'Le Nostre Agenzie Partner',
+        'agency_visit': 'Visita il sito',
+        'pricing_title': 'I Nostri Prezzi',
+        'pricing_subtitle': 'Scegli il piano che fa per te',
+        'plan_basic': 'Basic',
+        'plan_premium': 'Premium',
+        'plan_basic_price': '99€/anno',
+        'plan_premium_price': '199€/anno',
+        'plan_basic_features': 'Scheda agenzia standard\nLink al tuo sito\nSupporto email',
+        'plan_premium_features': 'Scheda agenzia in evidenza\nLogo e immagini personalizzate\nSupporto prioritario\nStatistiche visite',
+        'plan_contact': 'Contattaci',
+        
+        # Contact
+        'contact_title': 'Contattaci',
+        'contact_subtitle': 'Una domanda? Un progetto? Non esitare a scriverci',
+        'contact_name': 'Nome completo',
+        'contact_email': 'Email',
+        'contact_phone': 'Telefono',
+        'contact_subject': 'Oggetto',
+        'contact_message': 'Messaggio',
+        'contact_send': 'Invia',
+        'contact_success': 'Il tuo messaggio è stato inviato con successo!',
+        'contact_error_required': 'Compila tutti i campi obbligatori.',
+        'contact_error_save': 'Errore nel salvare il messaggio.',
+        'contact_email_error': 'Messaggio salvato ma errore nell\'invio email.',
+        
+        # Footer
+        'footer_privacy': 'Politica Privacy',
+        'footer_copyright': '© 2024 Immobiliare Marsiglia. Tutti i diritti riservati.',
+        
+        # Privacy
+        'privacy_title': 'Politica sulla Privacy',
+        'privacy_content': 'Questa pagina descrive la nostra politica sulla privacy...'
+    },
+    'es': {
+        # Navigation
+        'nav_home': 'Inicio',
+        'nav_contact': 'Contacto',
+        'nav_admin': 'Admin',
+        'nav_language': 'Idioma',
+        
+        # Homepage
+        'site_title': 'Inmobiliaria Marsella',
+        'site_subtitle': 'Todos los portales en un solo lugar - Directorio Inmobiliario',
+        'hero_title': 'Encuentra tu agencia inmobiliaria en Marsella',
+        'hero_subtitle': 'Descubre las mejores agencias inmobiliarias de la región de Marsella',
+        'agencies_title': 'Nuestras Agencias Asociadas',
+        'agency_visit': 'Visitar sitio',
+        'pricing_title': 'Nuestros Precios',
+        'pricing_subtitle': 'Elige el plan que más te convenga',
+        'plan_basic': 'Básico',
+        'plan_premium': 'Premium',
+        'plan_basic_price': '99€/año',
+        'plan_premium_price': '199€/año',
+        'plan_basic_features': 'Ficha de agencia estándar\nEnlace a tu sitio web\nSoporte por email',
+        'plan_premium_features': 'Ficha de agencia destacada\nLogo e imágenes personalizadas\nSoporte prioritario\nEstadísticas de visitas',
+        'plan_contact': 'Contáctanos',
+        
+        # Contact
+        'contact_title': 'Contáctanos',
+        'contact_subtitle': '¿Una pregunta? ¿Un proyecto? No dudes en escribirnos',
+        'contact_name': 'Nombre completo',
+        'contact_email': 'Email',
+        'contact_phone': 'Teléfono',
+        'contact_subject': 'Asunto',
+        'contact_message': 'Mensaje',
+        'contact_send': 'Enviar',
+        'contact_success': '¡Tu mensaje ha sido enviado con éxito!',
+        'contact_error_required': 'Por favor completa todos los campos obligatorios.',
+        'contact_error_save': 'Error al guardar el mensaje.',
+        'contact_email_error': 'Mensaje guardado pero error al enviar email.',
+        
+        # Footer
+        'footer_privacy': 'Política de Privacidad',
+        'footer_copyright': '© 2024 Inmobiliaria Marsella. Todos los derechos reservados.',
+        
+        # Privacy
+        'privacy_title': 'Política de Privacidad',
+        'privacy_content': 'Esta página describe nuestra política de privacidad...'
+    },
+    'pt': {
+        # Navigation
+        'nav_home': 'Início',
+        'nav_contact': 'Contato',
+        'nav_admin': 'Admin',
+        'nav_language': 'Idioma',
+        
+        # Homepage
+        'site_title': 'Imobiliária Marselha',
+        'site_subtitle': 'Todos os portais em um só lugar - Diretório Imobiliário',
+        'hero_title': 'Encontre sua agência imobiliária em Marselha',
+        'hero_subtitle': 'Descubra as melhores agências imobiliárias da região de Marselha',
+        'agencies_title': 'Nossas Agências Parceiras',
+        'agency_visit': 'Visitar site',
+        'pricing_title': 'Nossos Preços',
+        'pricing_subtitle': 'Escolha o plano que mais te convém',
+        'plan_basic': 'Básico',
+        'plan_premium': 'Premium',
+        'plan_basic_price': '99€/ano',
+        'plan_premium_price': '199€/ano',
+        'plan_basic_features': 'Ficha de agência padrão\nLink para seu site\nSuporte por email',
+        'plan_premium_features': 'Ficha de agência destacada\nLogo e imagens personalizadas\nSuporte prioritário\nEstatísticas de visitas',
+        'plan_contact': 'Entre em contato',
+        
+        # Contact
+        'contact_title': 'Entre em contato',
+        'contact_subtitle': 'Uma pergunta? Um projeto? Não hesite em nos escrever',
+        'contact_name': 'Nome completo',
+        'contact_email': 'Email',
+        'contact_phone': 'Telefone',
+        'contact_subject': 'Assunto',
+        'contact_message': 'Mensagem',
+        'contact_send': 'Enviar',
+        'contact_success': 'Sua mensagem foi enviada com sucesso!',
+        'contact_error_required': 'Por favor preencha todos os campos obrigatórios.',
+        'contact_error_save': 'Erro ao salvar a mensagem.',
+        'contact_email_error': 'Mensagem salva mas erro ao enviar email.',
+        
+        # Footer
+        'footer_privacy': 'Política de Privacidade',
+        'footer_copyright': '© 2024 Imobiliária Marselha. Todos os direitos reservados.',
+        
+        # Privacy
+        'privacy_title': 'Política de Privacidade',
+        'privacy_content': 'Esta página descreve nossa política de privacidade...'
+    }
+}
+
 def initialize_application():
     """Initialize application with default data"""
     logger = logging.getLogger(__name__)
@@ -21,6 +327,8 @@ def initialize_application():
         
         # Create database tables
         db.create_all()
+        upgrade_schema()
+        ensure_search_index()
         logger.info("Database tables created")
         
         # Create default admin user if none exists
@@ -41,6 +349,57 @@ def initialize_application():
         logger.error(f"Error during auto-setup: {e}")
         raise
 
+def backfill_plan_tiers():
+    """Give existing plans tiers that keep their former name-based ranking"""
+    for tier, plan in enumerate(Plan.query.order_by(Plan.name.asc()).all(), start=1):
+        plan.tier = tier
+
+# Columns added after the first release: (table, column, DDL, backfill function)
+SCHEMA_UPGRADES = [
+    ('plan', 'tier', 'INTEGER NOT NULL DEFAULT 0', backfill_plan_tiers),
+    ('agency_image', 'processing_status', "VARCHAR(20) NOT NULL DEFAULT 'ready'", None),
+    # Image metadata, filled for existing files by `flask backfill-image-metadata`
+    ('agency', 'logo_width', 'INTEGER', None),
+    ('agency', 'logo_height', 'INTEGER', None),
+    ('agency', 'cover_width', 'INTEGER', None),
+    ('agency', 'cover_height', 'INTEGER', None),
+    ('agency', 'cover_color', 'VARCHAR(7)', None),
+    ('agency', 'cover_placeholder', 'TEXT', None),
+    ('agency_image', 'image_width', 'INTEGER', None),
+    ('agency_image', 'image_height', 'INTEGER', None),
+    ('agency_image', 'image_color', 'VARCHAR(7)', None),
+    ('agency_image', 'image_placeholder', 'TEXT', None),
+    ('carousel_item', 'image_width', 'INTEGER', None),
+    ('carousel_item', 'image_height', 'INTEGER', None),
+    ('carousel_item', 'image_color', 'VARCHAR(7)', None),
+    ('carousel_item', 'image_placeholder', 'TEXT', None),
+    # Stored variants, generated for existing files by `flask generate-image-variants`
+    ('agency', 'logo_variants', 'BOOLEAN NOT NULL DEFAULT FALSE', None),
+    ('agency', 'cover_variants', 'BOOLEAN NOT NULL DEFAULT FALSE', None),
+    ('agency_image', 'image_variants', 'BOOLEAN NOT NULL DEFAULT FALSE', None),
+    ('carousel_item', 'image_variants', 'BOOLEAN NOT NULL DEFAULT FALSE', None),
+]
+
+def upgrade_schema():
+    """Add columns and indexes missing from a database created by an older version"""
+    logger = logging.getLogger(__name__)
+    
+    inspector = db.inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    
+    for table, column, ddl, backfill in SCHEMA_UPGRADES:
+        existing_columns = {c['name'] for c in inspector.get_columns(table)}
+        if column not in existing_columns:
+            db.session.execute(db.text(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {ddl}'))
+            if backfill:
+                backfill()
+            db.session.commit()
+            logger.info(f"Added column {table}.{column}")
+    
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
 def create_default_admin():
     """Create default admin user"""
     logger = logging.getLogger(__name__)
@@ -74,13 +433,15 @@ def create_default_plans():
                 'name': 'Basic',
                 'price': 9.0,
                 'billing_period': 'monthly',
-                'description': 'Fiche agence standard\nLien vers votre site\nSupport email'
+                'description': 'Fiche agence standard\nLien vers votre site\nSupport email',
+                'tier': 1
             },
             {
                 'name': 'Premium',
                 'price': 19.0,
                 'billing_period': 'monthly',
-                'description': 'Fiche agence mise en avant\nLogo et images personnalisés\nSupport prioritaire\nStatistiques de visite'
+                'description': 'Fiche agence mise en avant\nLogo et images personnalisés\nSupport prioritaire\nStatistiques de visite',
+                'tier': 2
             }
         ]
         
@@ -90,6 +451,7 @@ def create_default_plans():
             plan.price = plan_data['price']
             plan.billing_period = plan_data['billing_period']
             plan.description = plan_data['description']
+            plan.tier = plan_data['tier']
             db.session.add(plan)
         
         db.session.commit()
@@ -154,6 +516,7 @@ def create_sample_agencies():
             agency.sort_order = agency_data['sort_order']
             db.session.add(agency)
         
+        adjust_counters(total_agencies=len(sample_agencies), active_agencies=len(sample_agencies))
         db.session.commit()
         logger.info(f"Created {len(sample_agencies)} sample agencies")
     else:
@@ -166,309 +529,7 @@ def initialize_translations():
     translations_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations')
     os.makedirs(translations_dir, exist_ok=True)
     
-    # Define translations for all languages
-    translations = {
-        'fr': {
-            # Navigation
-            'nav_home': 'Accueil',
-            'nav_contact': 'Contact',
-            'nav_admin': 'Administration',
-            'nav_language': 'Langue',
-            
-            # Homepage
-            'site_title': 'Marseille Immobilier',
-            'site_subtitle': 'Tous les portails en un seul endroit - Annuaire Immobilier',
-            'hero_title': 'Trouvez votre agence immobilière à Marseille',
-            'hero_subtitle': 'Découvrez les meilleures agences immobilières de la région marseillaise',
-            'agencies_title': 'Nos Agences Partenaires',
-            'agency_visit': 'Visiter le site',
-            'pricing_title': 'Nos Tarifs',
-            'pricing_subtitle': 'Choisissez le plan qui vous convient',
-            'plan_basic': 'Basic',
-            'plan_premium': 'Premium',
-            'plan_basic_price': '99€/an',
-            'plan_premium_price': '199€/an',
-            'plan_basic_features': 'Fiche agence standard\nLien vers votre site\nSupport email',
-            'plan_premium_features': 'Fiche agence mise en avant\nLogo et images personnalisés\nSupport prioritaire\nStatistiques de visite',
-            'plan_contact': 'Nous contacter',
-            
-            # Contact
-            'contact_title': 'Contactez-nous',
-            'contact_subtitle': 'Une question ? Un projet ? N\'hésitez pas à nous écrire',
-            'contact_name': 'Nom complet',
-            'contact_email': 'Email',
-            'contact_phone': 'Téléphone',
-            'contact_subject': 'Sujet',
-            'contact_message': 'Message',
-            'contact_send': 'Envoyer',
-            'contact_success': 'Votre message a été envoyé avec succès !',
-            'contact_error_required': 'Veuillez remplir tous les champs obligatoires.',
-            'contact_error_save': 'Erreur lors de l\'enregistrement du message.',
-            'contact_email_error': 'Message enregistré mais erreur lors de l\'envoi de l\'email.',
-            
-            # Admin
-            'admin_login': 'Connexion Admin',
-            'admin_username': 'Nom d\'utilisateur',
-            'admin_password': 'Mot de passe',
-            'admin_login_btn': 'Se connecter',
-            'admin_dashboard': 'Tableau de bord',
-            'admin_agencies': 'Agences',
-            'admin_messages': 'Messages',
-            'admin_logout': 'Déconnexion',
-            'login_error_required': 'Nom d\'utilisateur et mot de passe requis.',
-            'login_error_invalid': 'Identifiants invalides.',
-            'logout_success': 'Déconnexion réussie.',
-            
-            # Agencies management
-            'agencies_add': 'Ajouter une agence',
-            'agencies_edit': 'Modifier',
-            'agencies_delete': 'Supprimer',
-            'agency_name': 'Nom de l\'agence',
-            'agency_city': 'Ville',
-            'agency_website': 'Site web',
-            'agency_description': 'Description',
-            'agency_logo': 'Logo',
-            'agency_cover': 'Image de couverture',
-            'agency_plan': 'Plan',
-            'agency_active': 'Agence active',
-            'agency_save': 'Enregistrer',
-            'agency_cancel': 'Annuler',
-            'agency_add_success': 'Agence ajoutée avec succès.',
-            'agency_edit_success': 'Agence modifiée avec succès.',
-            'agency_delete_success': 'Agence supprimée avec succès.',
-            'agency_error_required': 'Nom, ville et site web sont obligatoires.',
-            'agency_error_save': 'Erreur lors de l\'enregistrement.',
-            'agency_error_delete': 'Erreur lors de la suppression.',
-            
-            # Footer
-            'footer_privacy': 'Politique de confidentialité',
-            'footer_copyright': '© 2024 Marseille Immobilier. Tous droits réservés.',
-            
-            # Privacy
-            'privacy_title': 'Politique de confidentialité',
-            'privacy_content': 'Cette page décrit notre politique de confidentialité...'
-        },
-        'en': {
-            # Navigation
-            'nav_home': 'Home',
-            'nav_contact': 'Contact',
-            'nav_admin': 'Admin',
-            'nav_language': 'Language',
-            
-            # Homepage
-            'site_title': 'Marseille Real Estate',
-            'site_subtitle': 'All portals in one place - Real Estate Directory',
-            'hero_title': 'Find your real estate agency in Marseille',
-            'hero_subtitle': 'Discover the best real estate agencies in the Marseille region',
-            'agencies_title': 'Our Partner Agencies',
-            'agency_visit': 'Visit website',
-            'pricing_title': 'Our Pricing',
-            'pricing_subtitle': 'Choose the plan that suits you',
-            'plan_basic': 'Basic',
-            'plan_premium': 'Premium',
-            'plan_basic_price': '€99/year',
-            'plan_premium_price': '€199/year',
-            'plan_basic_features': 'Standard agency listing\nLink to your website\nEmail support',
-            'plan_premium_features': 'Featured agency listing\nCustom logo and images\nPriority support\nVisit statistics',
-            'plan_contact': 'Contact us',
-            
-            # Contact
-            'contact_title': 'Contact us',
-            'contact_subtitle': 'A question? A project? Don\'t hesitate to write to us',
-            'contact_name': 'Full name',
-            'contact_email': 'Email',
-            'contact_phone': 'Phone',
-            'contact_subject': 'Subject',
-            'contact_message': 'Message',
-            'contact_send': 'Send',
-            'contact_success': 'Your message has been sent successfully!',
-            'contact_error_required': 'Please fill in all required fields.',
-            'contact_error_save': 'Error saving the message.',
-            'contact_email_error': 'Message saved but error sending email.',
-            
-            # Admin
-            'admin_login': 'Admin Login',
-            'admin_username': 'Username',
-            'admin_password': 'Password',
-            'admin_login_btn': 'Login',
-            'admin_dashboard': 'Dashboard',
-            'admin_agencies': 'Agencies',
-            'admin_messages': 'Messages',
-            'admin_logout': 'Logout',
-            'login_error_required': 'Username and password required.',
-            'login_error_invalid': 'Invalid credentials.',
-            'logout_success': 'Successfully logged out.',
-            
-            # Agencies management
-            'agencies_add': 'Add agency',
-            'agencies_edit': 'Edit',
-            'agencies_delete': 'Delete',
-            'agency_name': 'Agency name',
-            'agency_city': 'City',
-            'agency_website': 'Website',
-            'agency_description': 'Description',
-            'agency_logo': 'Logo',
-            'agency_cover': 'Cover image',
-            'agency_plan': 'Plan',
-            'agency_active': 'Active agency',
-            'agency_save': 'Save',
-            'agency_cancel': 'Cancel',
-            'agency_add_success': 'Agency added successfully.',
-            'agency_edit_success': 'Agency updated successfully.',
-            'agency_delete_success': 'Agency deleted successfully.',
-            'agency_error_required': 'Name, city and website are required.',
-            'agency_error_save': 'Error saving the agency.',
-            'agency_error_delete': 'Error deleting the agency.',
-            
-            # Footer
-            'footer_privacy': 'Privacy Policy',
-            'footer_copyright': '© 2024 Marseille Real Estate. All rights reserved.',
-            
-            # Privacy
-            'privacy_title': 'Privacy Policy',
-            'privacy_content': 'This page describes our privacy policy...'
-        },
-        'it': {
-            # Navigation
-            'nav_home': 'Home',
-            'nav_contact': 'Contatto',
-            'nav_admin': 'Admin',
-            'nav_language': 'Lingua',
-            
-            # Homepage
-            'site_title': 'Immobiliare Marsiglia',
-            'site_subtitle': 'Tutti i portali in un unico posto - Elenco Immobiliare',
-            'hero_title': 'Trova la tua agenzia immobiliare a Marsiglia',
-            'hero_subtitle': 'Scopri le migliori agenzie immobiliari della regione di Marsiglia',
-            'agencies_title': 'Le Nostre Agenzie Partner',
-            'agency_visit': 'Visita il sito',
-            'pricing_title': 'I Nostri Prezzi',
-            'pricing_subtitle': 'Scegli il piano che fa per te',
-            'plan_basic': 'Basic',
-            'plan_premium': 'Premium',
-            'plan_basic_price': '99€/anno',
-            'plan_premium_price': '199€/anno',
-            'plan_basic_features': 'Scheda agenzia standard\nLink al tuo sito\nSupporto email',
-            'plan_premium_features': 'Scheda agenzia in evidenza\nLogo e immagini personalizzate\nSupporto prioritario\nStatistiche visite',
-            'plan_contact': 'Contattaci',
-            
-            # Contact
-            'contact_title': 'Contattaci',
-            'contact_subtitle': 'Una domanda? Un progetto? Non esitare a scriverci',
-            'contact_name': 'Nome completo',
-            'contact_email': 'Email',
-            'contact_phone': 'Telefono',
-            'contact_subject': 'Oggetto',
-            'contact_message': 'Messaggio',
-            'contact_send': 'Invia',
-            'contact_success': 'Il tuo messaggio è stato inviato con successo!',
-            'contact_error_required': 'Compila tutti i campi obbligatori.',
-            'contact_error_save': 'Errore nel salvare il messaggio.',
-            'contact_email_error': 'Messaggio salvato ma errore nell\'invio email.',
-            
-            # Footer
-            'footer_privacy': 'Politica Privacy',
-            'footer_copyright': '© 2024 Immobiliare Marsiglia. Tutti i diritti riservati.',
-            
-            # Privacy
-            'privacy_title': 'Politica sulla Privacy',
-            'privacy_content': 'Questa pagina descrive la nostra politica sulla privacy...'
-        },
-        'es': {
-            # Navigation
-            'nav_home': 'Inicio',
-            'nav_contact': 'Contacto',
-            'nav_admin': 'Admin',
-            'nav_language': 'Idioma',
-            
-            # Homepage
-            'site_title': 'Inmobiliaria Marsella',
-            'site_subtitle': 'Todos los portales en un solo lugar - Directorio Inmobiliario',
-            'hero_title': 'Encuentra tu agencia inmobiliaria en Marsella',
-            'hero_subtitle': 'Descubre las mejores agencias inmobiliarias de la región de Marsella',
-            'agencies_title': 'Nuestras Agencias Asociadas',
-            'agency_visit': 'Visitar sitio',
-            'pricing_title': 'Nuestros Precios',
-            'pricing_subtitle': 'Elige el plan que más te convenga',
-            'plan_basic': 'Básico',
-            'plan_premium': 'Premium',
-            'plan_basic_price': '99€/año',
-            'plan_premium_price': '199€/año',
-            'plan_basic_features': 'Ficha de agencia estándar\nEnlace a tu sitio web\nSoporte por email',
-            'plan_premium_features': 'Ficha de agencia destacada\nLogo e imágenes personalizadas\nSoporte prioritario\nEstadísticas de visitas',
-            'plan_contact': 'Contáctanos',
-            
-            # Contact
-            'contact_title': 'Contáctanos',
-            'contact_subtitle': '¿Una pregunta? ¿Un proyecto? No dudes en escribirnos',
-            'contact_name': 'Nombre completo',
-            'contact_email': 'Email',
-            'contact_phone': 'Teléfono',
-            'contact_subject': 'Asunto',
-            'contact_message': 'Mensaje',
-            'contact_send': 'Enviar',
-            'contact_success': '¡Tu mensaje ha sido enviado con éxito!',
-            'contact_error_required': 'Por favor completa todos los campos obligatorios.',
-            'contact_error_save': 'Error al guardar el mensaje.',
-            'contact_email_error': 'Mensaje guardado pero error al enviar email.',
-            
-            # Footer
-            'footer_privacy': 'Política de Privacidad',
-            'footer_copyright': '© 2024 Inmobiliaria Marsella. Todos los derechos reservados.',
-            
-            # Privacy
-            'privacy_title': 'Política de Privacidad',
-            'privacy_content': 'Esta página describe nuestra política de privacidad...'
-        },
-        'pt': {
-            # Navigation
-            'nav_home': 'Início',
-            'nav_contact': 'Contato',
-            'nav_admin': 'Admin',
-            'nav_language': 'Idioma',
-            
-            # Homepage
-            'site_title': 'Imobiliária Marselha',
-            'site_subtitle': 'Todos os portais em um só lugar - Diretório Imobiliário',
-            'hero_title': 'Encontre sua agência imobiliária em Marselha',
-            'hero_subtitle': 'Descubra as melhores agências imobiliárias da região de Marselha',
-            'agencies_title': 'Nossas Agências Parceiras',
-            'agency_visit': 'Visitar site',
-            'pricing_title': 'Nossos Preços',
-            'pricing_subtitle': 'Escolha o plano que mais te convém',
-            'plan_basic': 'Básico',
-            'plan_premium': 'Premium',
-            'plan_basic_price': '99€/ano',
-            'plan_premium_price': '199€/ano',
-            'plan_basic_features': 'Ficha de agência padrão\nLink para seu site\nSuporte por email',
-            'plan_premium_features': 'Ficha de agência destacada\nLogo e imagens personalizadas\nSuporte prioritário\nEstatísticas de visitas',
-            'plan_contact': 'Entre em contato',
-            
-            # Contact
-            'contact_title': 'Entre em contato',
-            'contact_subtitle': 'Uma pergunta? Um projeto? Não hesite em nos escrever',
-            'contact_name': 'Nome completo',
-            'contact_email': 'Email',
-            'contact_phone': 'Telefone',
-            'contact_subject': 'Assunto',
-            'contact_message': 'Mensagem',
-            'contact_send': 'Enviar',
-            'contact_success': 'Sua mensagem foi enviada com sucesso!',
-            'contact_error_required': 'Por favor preencha todos os campos obrigatórios.',
-            'contact_error_save': 'Erro ao salvar a mensagem.',
-            'contact_email_error': 'Mensagem salva mas erro ao enviar email.',
-            
-            # Footer
-            'footer_privacy': 'Política de Privacidade',
-            'footer_copyright': '© 2024 Imobiliária Marselha. Todos os direitos reservados.',
-            
-            # Privacy
-            'privacy_title': 'Política de Privacidade',
-            'privacy_content': 'Esta página descreve nossa política de privacidade...'
-        }
-    }
-    
-    for lang_code, lang_translations in translations.items():
+    for lang_code, lang_translations in DEFAULT_TRANSLATIONS.items():
         translation_file = os.path.join(translations_dir, f'{lang_code}.json')
         
         if not os.path.exists(translation_file):
@@ -478,3 +539,35 @@ def initialize_translations():
             logger.info(f"Created translation file: {lang_code}.json")
         else:
             logger.info(f"Translation file already exists: {lang_code}.json")
+    
+    if current_app.config.get('TRANSLATION_BACKEND') == 'database':
+        seed_translation_table()
+
+def load_source_translations():
+    """Get the default translations overridden key by key by the JSON files"""
+    from i18n import TRANSLATIONS_DIR, read_translation_files
+    
+    os.makedirs(TRANSLATIONS_DIR, exist_ok=True)
+    
+    languages = {language: dict(translations) for language, translations in DEFAULT_TRANSLATIONS.items()}
+    for language, translations in read_translation_files().items():
+        languages.setdefault(language, {}).update(translations)
+    return languages
+
+def seed_translation_table():
+    """Load translations into the Translation table if it is empty"""
+    logger = logging.getLogger(__name__)
+    
+    if Translation.query.first() is not None:
+        logger.info("Translation table already populated")
+        return
+    
+    rows = [
+        {'key': key, 'language': language, 'value': value}
+        for language, translations in load_source_translations().items()
+        for key, value in translations.items()
+    ]
+    db.session.execute(db.insert(Translation), rows)
+    bump_generation(TRANSLATIONS_GENERATION)
+    db.session.commit()
+    logger.info(f"Loaded {len(rows)} translations into the database")
@@ -0,0 +1,191 @@
+"""
+Cache helpers for the Marseille Immobilier application
+
+Named generations live in the database so that every worker process can
+tell when data behind one of its in-process caches has changed: writers bump
+a generation, and each worker reads the whole (tiny) generation table at
+most once every CACHE_GENERATION_CHECK_INTERVAL seconds. Rendered public
+pages are cached in memory per host, path and language, and their ETag /
+Last-Modified validators are derived from the same generations.
+"""
+
+import time
+import hashlib
+import threading
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, session
+from werkzeug.http import is_resource_modified
+from flask_login import current_user
+from app import db
+from i18n import get_catalog_version
+from models import Agency, CarouselItem, CarouselSettings, CacheGeneration
+
+TRANSLATIONS_GENERATION = 'translations'
+PAGES_GENERATION = 'pages'
+
+# Maximum number of rendered pages kept before the cache is emptied
+PAGE_CACHE_MAX_ENTRIES = 256
+
+# (host, path, language, catalog_version) -> (body, status, headers)
+_pages = {}
+_pages_epoch = 0
+_pages_lock = threading.Lock()
+
+# Latest update time of public content, memoized until pages are dropped
+_last_modified = None
+
+# Generations as last seen by this worker
+_generations = {}
+_next_generation_check = 0.0
+
+def get_generation(name):
+    """Get the current value of a named generation"""
+    value = db.session.execute(
+        db.select(CacheGeneration.value).where(CacheGeneration.name == name)
+    ).scalar()
+    return value or 0
+
+def bump_generation(name, connection=None):
+    """Increment a named generation, in the current transaction unless a connection is given"""
+    executor = connection if connection is not None else db.session
+    now = datetime.utcnow()
+    result = executor.execute(
+        db.update(CacheGeneration)
+        .where(CacheGeneration.name == name)
+        .values(value=CacheGeneration.value + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        executor.execute(db.insert(CacheGeneration).values(name=name, value=1, updated_at=now))
+
+def current_generations():
+    """Get every named generation, reading the table at most once per check interval"""
+    global _generations, _next_generation_check
+    if time.monotonic() < _next_generation_check:
+        return _generations
+    
+    generations = dict(db.session.execute(db.select(CacheGeneration.name, CacheGeneration.value)).all())
+    if generations.get(PAGES_GENERATION) != _generations.get(PAGES_GENERATION):
+        _drop_pages()
+    
+    _generations = generations
+    _next_generation_check = time.monotonic() + current_app.config.get('CACHE_GENERATION_CHECK_INTERVAL', 1.0)
+    return generations
+
+def _is_cacheable_request():
+    """Check whether the current request may be served from the page cache"""
+    return (
+        request.method == 'GET'
+        and not request.args
+        and '_flashes' not in session
+        and not current_user.is_authenticated
+    )
+
+def cached_page(view):
+    """Serve a public page from memory, rendering it only on a cache miss"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _is_cacheable_request():
+            return view(*args, **kwargs)
+        
+        current_generations()
+        key = (request.host, request.path, session.get('language', 'fr'), get_catalog_version())
+        cached = _pages.get(key)
+        if cached is not None:
+            body, status, headers = cached
+            return current_app.response_class(body, status=status, headers=headers)
+        
+        epoch = _pages_epoch
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough:
+            with _pages_lock:
+                # Skip storing if the cache was invalidated while rendering
+                if epoch == _pages_epoch:
+                    if len(_pages) >= PAGE_CACHE_MAX_ENTRIES:
+                        _pages.clear()
+                    _pages[key] = (response.get_data(), response.status_code, list(response.headers))
+        return response
+    return wrapper
+
+def _drop_pages():
+    """Drop every page cached by this worker"""
+    global _pages_epoch, _last_modified
+    with _pages_lock:
+        _pages.clear()
+        _pages_epoch += 1
+        _last_modified = None
+
+def invalidate_pages():
+    """Drop cached pages in every worker
+
+    Bumps the pages generation on its own connection and transaction, so
+    the request session is never flushed or committed; call it once the
+    data changes are committed.
+    """
+    global _next_generation_check
+    with db.engine.begin() as connection:
+        bump_generation(PAGES_GENERATION, connection)
+    _drop_pages()
+    # Re-read generations on the next request so this bump is not seen as foreign
+    _next_generation_check = 0.0
+
+def public_last_modified():
+    """Get the latest update time of public content
+
+    Deletes, plan and translation changes leave no updated_at behind, so
+    the time of the last pages invalidation is taken into account as well.
+    """
+    global _last_modified
+    current_generations()
+    last_modified = _last_modified
+    if last_modified is None:
+        row = db.session.execute(db.select(
+            db.select(db.func.max(Agency.updated_at)).scalar_subquery(),
+            db.select(db.func.max(CarouselItem.updated_at)).scalar_subquery(),
+            db.select(db.func.max(CarouselSettings.updated_at)).scalar_subquery(),
+            db.select(CacheGeneration.updated_at).where(CacheGeneration.name == PAGES_GENERATION).scalar_subquery()
+        )).one()
+        last_modified = max((value for value in row if value is not None), default=datetime(2024, 1, 1))
+        _last_modified = last_modified
+    return last_modified
+
+def _public_validator(per_language):
+    """Get the (etag, last_modified) pair describing the current public content"""
+    last_modified = public_last_modified()
+    parts = [
+        request.host,
+        request.full_path,
+        str(_generations.get(PAGES_GENERATION, 0)),
+        last_modified.isoformat()
+    ]
+    if per_language:
+        parts += [session.get('language', 'fr'), get_catalog_version(), str(current_user.is_authenticated)]
+    etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+    return etag, last_modified
+
+def conditional_page(per_language=True):
+    """Answer If-None-Match / If-Modified-Since with 304 before the view runs"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+            
+            etag, last_modified = _public_validator(per_language)
+            if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+            
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            if per_language:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,147 @@
+"""
+CLI commands for the Marseille Immobilier application
+"""
+
+import click
+from app import app
+
+@app.cli.command('compile-translations')
+def compile_translations():
+    """Compile every language into the precompiled translation bundle"""
+    from auto_setup import load_source_translations
+    from i18n import BUNDLE_FILE, compile_bundle
+    
+    languages = load_source_translations()
+    version = compile_bundle(languages)
+    click.echo(f"Compiled {len(languages)} languages into {BUNDLE_FILE} (version {version})")
+
+@app.cli.command('process-pending-images')
+def process_pending_images():
+    """Generate variants for gallery images left pending, e.g. after a restart"""
+    from app import db
+    from jobs import process_agency_image
+    from models import AgencyImage
+    
+    pending_ids = db.session.execute(
+        db.select(AgencyImage.id).where(AgencyImage.processing_status == 'pending')
+    ).scalars().all()
+    for image_id in pending_ids:
+        process_agency_image(image_id)
+    click.echo(f"Processed {len(pending_ids)} pending images")
+
+@app.cli.command('backfill-image-metadata')
+@click.option('--batch-size', default=200, show_default=True, help='Records updated per transaction.')
+@click.option('--force', is_flag=True, help='Recompute images that already have metadata.')
+def backfill_image_metadata(batch_size, force):
+    """Compute dimensions, dominant colors and placeholders of existing images"""
+    from cache import invalidate_pages
+    from storage import backfill_image_metadata
+    
+    count = backfill_image_metadata(batch_size=batch_size, force=force)
+    if count:
+        invalidate_pages()
+    click.echo(f"Updated image metadata on {count} records")
+
+@app.cli.command('generate-image-variants')
+@click.option('--batch-size', default=200, show_default=True, help='Records updated per transaction.')
+@click.option('--force', is_flag=True, help='Regenerate variants that are already recorded.')
+def generate_image_variants(batch_size, force):
+    """Generate the missing resized variants of existing images"""
+    from cache import invalidate_pages
+    from storage import backfill_image_variants
+    
+    count = backfill_image_variants(batch_size=batch_size, force=force)
+    if count:
+        invalidate_pages()
+    click.echo(f"Recorded variants on {count} records")
+
+@app.cli.command('rebuild-file-references')
+def rebuild_file_references():
+    """Recount references to every upload from the database"""
+    from storage import rebuild_references
+    
+    count = rebuild_references()
+    click.echo(f"Rebuilt references for {count} stored files")
+
+@app.cli.command('collect-orphaned-uploads')
+@click.option('--min-age', default=3600, show_default=True, help='Keep files modified less than this many seconds ago.')
+@click.option('--batch-size', default=500, show_default=True, help='Files removed per batch.')
+@click.option('--quarantine', is_flag=True, help='Move orphans to uploads/.quarantine instead of deleting them.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+def collect_orphaned_uploads(min_age, batch_size, quarantine, dry_run):
+    """Remove upload files that no record references"""
+    from storage import collect_garbage
+    
+    stats = collect_garbage(min_age=min_age, batch_size=batch_size, quarantine=quarantine, dry_run=dry_run)
+    click.echo(f"Scanned {stats['scanned']} files, {stats['orphaned']} orphaned ({stats['bytes']} bytes)")
+    if not dry_run:
+        click.echo(f"{'Quarantined' if quarantine else 'Removed'} {stats['removed']} files")
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recount the admin dashboard counters from the database"""
+    from stats import rebuild_counters
+    
+    values = rebuild_counters()
+    click.echo(', '.join(f"{name}={value}" for name, value in values.items()))
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Re-index every agency for full-text search"""
+    from search import ensure_search_index, rebuild_search_index
+    
+    ensure_search_index()
+    rebuild_search_index()
+    click.echo("Agency search index rebuilt")
+
+@app.cli.command('import-agencies')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Agencies inserted per transaction.')
+@click.option('--dry-run', is_flag=True, help='Only validate the file.')
+def import_agencies(path, file_format, chunk_size, dry_run):
+    """Import agencies from a CSV or JSON Lines file"""
+    from cache import invalidate_pages
+    from importer import detect_format, import_agencies
+    
+    file_format = file_format or detect_format(path)
+    if not file_format:
+        raise click.UsageError("Cannot guess the format from the file name, use --format")
+    
+    def echo_progress(report):
+        click.echo(f"{report['read']} rows read, {report['imported']} valid, {report['failed']} rejected")
+    
+    with open(path, 'rb') as stream:
+        report = import_agencies(stream, file_format, chunk_size=chunk_size, progress=echo_progress, dry_run=dry_run)
+    
+    for line_number, error in report['errors']:
+        click.echo(f"Line {line_number}: {error}", err=True)
+    if report['failed'] > len(report['errors']):
+        click.echo(f"... and {report['failed'] - len(report['errors'])} more errors", err=True)
+    if report['imported'] and not dry_run:
+        invalidate_pages()
+    click.echo(f"{'Validated' if dry_run else 'Imported'} {report['imported']} agencies, rejected {report['failed']} rows")
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(['agencies', 'messages']))
+@click.argument('path', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--start', help='Only rows created on or after this ISO date or datetime.')
+@click.option('--end', help='Only rows created before this datetime, or on or before this date.')
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the output with gzip.')
+def export(kind, path, file_format, start, end, compress):
+    """Export agencies or contact messages to a file ('-' for stdout)"""
+    from exporter import parse_date_range, stream_export
+    
+    try:
+        start, end = parse_date_range(start, end)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    
+    size = 0
+    with click.open_file(path, 'wb') as out:
+        for chunk in stream_export(kind, file_format, start, end, compress):
+            out.write(chunk)
+            size += len(chunk)
+    if path != '-':
+        click.echo(f"Exported {kind} to {path} ({size} bytes)")
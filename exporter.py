@@ -0,0 +1,152 @@
+"""
+Streaming exports of agencies and contact messages
+
+Rows are read from a server-side cursor in batches of EXPORT_BATCH_SIZE
+and encoded as CSV or JSON Lines chunk by chunk, optionally gzipped, so an
+export of any size runs in constant memory. Agency exports use the column
+layout read back by the importer.
+"""
+
+import io
+import csv
+import json
+import zlib
+from datetime import datetime, timedelta
+from app import db
+from models import Agency, ContactMessage, Plan
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# Leading characters that make spreadsheet applications evaluate a cell
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _agency_select():
+    """Select agencies in the importer's layout, plan name included"""
+    return (db.select(
+                Agency.id, Agency.name, Agency.city, Agency.website, Agency.description,
+                Plan.name.label('plan'), Agency.is_active, Agency.sort_order,
+                Agency.created_at, Agency.updated_at
+            )
+            .outerjoin(Plan, Agency.plan_id == Plan.id)
+            .order_by(Agency.id))
+
+def _message_select():
+    """Select contact messages, oldest first along the inbox index"""
+    return (db.select(
+                ContactMessage.id, ContactMessage.name, ContactMessage.email, ContactMessage.phone,
+                ContactMessage.subject, ContactMessage.message, ContactMessage.is_read,
+                ContactMessage.created_at
+            )
+            .order_by(ContactMessage.created_at, ContactMessage.id))
+
+EXPORTS = {
+    'agencies': (Agency, _agency_select),
+    'messages': (ContactMessage, _message_select),
+}
+
+def parse_date(value):
+    """Parse an ISO date or datetime filter, returning None for empty values
+
+    Raises ValueError if the value is malformed.
+    """
+    value = (value or '').strip()
+    return datetime.fromisoformat(value) if value else None
+
+def parse_date_range(start, end):
+    """Get the [start, end) created_at bounds of a filter; a bare end date includes that whole day"""
+    end_value = parse_date(end)
+    if end_value is not None and len(end.strip()) == len('YYYY-MM-DD'):
+        end_value += timedelta(days=1)
+    return parse_date(start), end_value
+
+def _format_value(value):
+    """Convert a column value to its exported form"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _escape_csv_value(value):
+    """Neutralize text a spreadsheet would run as a formula by prefixing a quote"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def unescape_csv_value(value):
+    """Drop the quote _escape_csv_value put in front of formula-like text"""
+    if isinstance(value, str) and value.startswith("'") and value[1:].startswith(CSV_FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+def iter_export_rows(kind, start=None, end=None):
+    """Yield the rows of an export as dicts, streamed from a server-side cursor
+
+    start is inclusive and end exclusive, both compared with created_at.
+    """
+    model, build_select = EXPORTS[kind]
+    statement = build_select()
+    if start is not None:
+        statement = statement.where(model.created_at >= start)
+    if end is not None:
+        statement = statement.where(model.created_at < end)
+
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        for row in result:
+            yield {key: _format_value(value) for key, value in row._mapping.items()}
+    finally:
+        result.close()
+
+def export_columns(kind):
+    """Get the column names of an export"""
+    return [column.key for column in EXPORTS[kind][1]().selected_columns]
+
+def iter_export(kind, file_format, start=None, end=None):
+    """Yield an export as text chunks of about EXPORT_BATCH_SIZE rows"""
+    buffer = io.StringIO()
+    writer = None
+    if file_format == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=export_columns(kind))
+        writer.writeheader()
+
+    count = 0
+    for row in iter_export_rows(kind, start, end):
+        if writer:
+            # Form fields are exported as typed by visitors and opened by admins
+            writer.writerow({key: _escape_csv_value(value) for key, value in row.items()})
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write('\n')
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def encode_chunks(chunks, compress=False):
+    """Encode text chunks to UTF-8, gzipping the stream when compress is set"""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_filename(kind, file_format, compress=False):
+    """Get the download file name of an export"""
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{file_format}"
+    return filename + '.gz' if compress else filename
+
+def stream_export(kind, file_format, start=None, end=None, compress=False):
+    """Yield an export as encoded bytes, ready to be written or sent"""
+    return encode_chunks(iter_export(kind, file_format, start, end), compress)
@@ -0,0 +1,185 @@
+"""
+Translation catalog for the Marseille Immobilier application
+
+Translations are loaded once per process and kept in memory as read-only
+mappings, with missing keys already resolved against French. With the
+'database' backend the catalog is read from the Translation table, otherwise
+from the compiled bundle when one exists and is newer than every JSON file
+(see ``compile_bundle``), or from the JSON files. It is only reloaded when
+its source changes. The source is checked at most every RELOAD_CHECK_INTERVAL seconds, so
+lookups between two checks never touch the filesystem.
+"""
+
+import os
+import json
+import marshal
+import hashlib
+import time
+import logging
+import threading
+from types import MappingProxyType
+from flask import current_app, has_app_context
+
+TRANSLATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations')
+BUNDLE_FILE = os.path.join(TRANSLATIONS_DIR, 'catalog.bundle')
+BUNDLE_FORMAT = 1
+DEFAULT_LANGUAGE = 'fr'
+
+# Minimum delay (in seconds) between two checks of the catalog source
+RELOAD_CHECK_INTERVAL = 2.0
+
+_EMPTY = MappingProxyType({})
+
+# (next_check, source_stamp, version, languages, language_codes)
+_snapshot = (0.0, None, '', {}, ())
+_snapshot_lock = threading.Lock()
+
+def _file_mtime(path):
+    """Get the modification time of a file, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _backend():
+    """Get the configured translation backend ('files' or 'database')"""
+    if has_app_context():
+        return current_app.config.get('TRANSLATION_BACKEND', 'files')
+    return 'files'
+
+def _source_stamp():
+    """Get a cheap stamp that changes whenever the catalog source changes"""
+    if _backend() == 'database':
+        from cache import current_generations, TRANSLATIONS_GENERATION
+        return ('database', current_generations().get(TRANSLATIONS_GENERATION, 0))
+
+    try:
+        filenames = sorted(f for f in os.listdir(TRANSLATIONS_DIR) if f.endswith('.json'))
+    except OSError:
+        filenames = []
+    files = tuple((f, _file_mtime(os.path.join(TRANSLATIONS_DIR, f))) for f in filenames)
+
+    # A bundle older than any JSON file is stale: the files win until it is recompiled
+    bundle_mtime = _file_mtime(BUNDLE_FILE)
+    if bundle_mtime is not None and all(mtime is None or mtime <= bundle_mtime for _, mtime in files):
+        return ('bundle', bundle_mtime)
+    return ('files', files)
+
+def resolve_fallbacks(languages):
+    """Merge every language over French so each one holds the complete key set"""
+    base = languages.get(DEFAULT_LANGUAGE, {})
+    resolved = {}
+    for language, translations in languages.items():
+        merged = dict(base)
+        merged.update(translations)
+        resolved[language] = {key: merged[key] for key in sorted(merged)}
+    return resolved
+
+def catalog_version(languages):
+    """Get the content hash of resolved translations, used as cache-busting version"""
+    payload = json.dumps(languages, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+def read_translation_files():
+    """Read every JSON translation file, keyed by language code"""
+    languages = {}
+    for filename in sorted(os.listdir(TRANSLATIONS_DIR)):
+        if filename.endswith('.json'):
+            with open(os.path.join(TRANSLATIONS_DIR, filename), 'r', encoding='utf-8') as f:
+                languages[filename[:-5]] = json.load(f)
+    return languages
+
+def read_translation_rows():
+    """Read every translation stored in the database in a single query"""
+    from app import db
+    from models import Translation
+
+    languages = {}
+    rows = db.session.execute(db.select(Translation.language, Translation.key, Translation.value))
+    for language, key, value in rows:
+        languages.setdefault(language, {})[key] = value
+    return languages
+
+def compile_bundle(languages, path=BUNDLE_FILE):
+    """Write resolved translations to a marshal bundle and return its version"""
+    resolved = resolve_fallbacks(languages)
+    version = catalog_version(resolved)
+    data = marshal.dumps({'format': BUNDLE_FORMAT, 'version': version, 'languages': resolved})
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return version
+
+def _load_languages(stamp):
+    """Load the catalog described by a source stamp"""
+    if stamp[0] == 'database':
+        languages = resolve_fallbacks(read_translation_rows())
+        version = catalog_version(languages)
+    elif stamp[0] == 'bundle':
+        with open(BUNDLE_FILE, 'rb') as f:
+            data = marshal.load(f)
+        if data.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported translation bundle format: {data.get('format')}")
+        version, languages = data['version'], data['languages']
+    elif stamp[1]:
+        if _file_mtime(BUNDLE_FILE) is not None:
+            logging.getLogger(__name__).warning(
+                f"Translation files are newer than {BUNDLE_FILE}; run 'flask compile-translations' to update it"
+            )
+        languages = resolve_fallbacks(read_translation_files())
+        version = catalog_version(languages)
+    else:
+        languages, version = {}, ''
+    return version, {language: MappingProxyType(t) for language, t in languages.items()}
+
+def _get_snapshot():
+    """Get the current catalog snapshot, reloading it if its source changed"""
+    global _snapshot
+    snapshot = _snapshot
+    if time.monotonic() < snapshot[0]:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        now = time.monotonic()
+        if now < snapshot[0]:
+            return snapshot
+
+        stamp = _source_stamp()
+        if stamp == snapshot[1]:
+            _snapshot = (now + RELOAD_CHECK_INTERVAL,) + snapshot[1:]
+        else:
+            version, languages = _load_languages(stamp)
+            _snapshot = (now + RELOAD_CHECK_INTERVAL, stamp, version, languages, tuple(sorted(languages)))
+        return _snapshot
+
+def get_catalog(language=DEFAULT_LANGUAGE):
+    """Get the read-only translations mapping for a language
+
+    Languages without translations resolve to the French catalog.
+    """
+    languages = _get_snapshot()[3]
+    catalog = languages.get(language)
+    if catalog is None:
+        catalog = languages.get(DEFAULT_LANGUAGE, _EMPTY)
+    return catalog
+
+def get_languages():
+    """Get the sorted codes of every language in the catalog"""
+    return _get_snapshot()[4]
+
+def get_catalog_version():
+    """Get the version hash of the loaded catalog"""
+    return _get_snapshot()[2]
+
+def preload_catalog():
+    """Load the catalog ahead of the first request and return its version"""
+    return get_catalog_version()
+
+def clear_catalog():
+    """Drop the loaded catalog so the next lookup reloads it"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = (0.0, None, '', {}, ())
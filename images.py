@@ -0,0 +1,131 @@
+"""
+Image processing for the Marseille Immobilier application
+
+Every raster image uploaded to one of the image folders gets resized
+variants at fixed widths, in WebP with a JPEG fallback, stored next to the
+original as ``<name>_<width>.<ext>``.
+"""
+
+import io
+import os
+import base64
+from PIL import Image, ImageOps
+
+# Upload folders whose images get responsive variants
+IMAGE_SUBFOLDERS = {'logos', 'covers', 'carousel', 'agencies'}
+
+# Image formats Pillow can resize (SVG is vector, GIF may be animated)
+RASTER_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+
+VARIANT_WIDTHS = (320, 640, 1280)
+
+# Longest side of the inline placeholder shown while an image loads
+PLACEHOLDER_SIZE = 16
+
+# (extension, Pillow format, save options), preferred format first
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+def has_metadata(filename):
+    """Check whether dimensions and a placeholder can be computed for an upload"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in RASTER_EXTENSIONS | {'gif'}
+
+def has_variants(filename, subfolder):
+    """Check whether an uploaded file gets responsive variants"""
+    return (
+        subfolder in IMAGE_SUBFOLDERS
+        and '.' in filename
+        and filename.rsplit('.', 1)[1].lower() in RASTER_EXTENSIONS
+    )
+
+def variant_filename(filename, width, extension):
+    """Get the filename of one variant of an uploaded image"""
+    return f"{os.path.splitext(filename)[0]}_{width}.{extension}"
+
+def variant_filenames(filename):
+    """Get the filenames of every variant of an uploaded image"""
+    return [
+        variant_filename(filename, width, extension)
+        for width in VARIANT_WIDTHS
+        for extension, _, _ in VARIANT_FORMATS
+    ]
+
+def variant_source_stem(filename):
+    """Get the name, without extension, of the original a variant was made from
+
+    Returns None when the filename is not a variant name.
+    """
+    stem, extension = os.path.splitext(filename)
+    base, _, width = stem.rpartition('_')
+    formats = {variant_extension for variant_extension, _, _ in VARIANT_FORMATS}
+    if base and width.isdigit() and int(width) in VARIANT_WIDTHS and extension[1:] in formats:
+        return base
+    return None
+
+def _flatten(image):
+    """Convert an image to RGB, compositing transparency over white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+def render_variants(fileobj, filename):
+    """Encode the resized variants of an image as (variant filename, buffer) pairs
+
+    Images narrower than a variant width are stored at their own size, so
+    every variant always exists and srcset URLs can be built without
+    touching the storage.
+    """
+    rendered = []
+
+    with Image.open(fileobj) as source:
+        # Let the JPEG decoder downscale while decoding when it can
+        source.draft('RGB', (max(VARIANT_WIDTHS), max(VARIANT_WIDTHS)))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.mode else 'RGB')
+
+        # Resize from the largest width down, reusing the previous result
+        for width in sorted(VARIANT_WIDTHS, reverse=True):
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+            for extension, image_format, options in VARIANT_FORMATS:
+                buffer = io.BytesIO()
+                variant = image if image_format == 'WEBP' else _flatten(image)
+                variant.save(buffer, image_format, **options)
+                buffer.seek(0)
+                rendered.append((variant_filename(filename, width, extension), buffer))
+
+    return rendered
+
+def read_image_metadata(fileobj):
+    """Get the display size, dominant color and inline placeholder of an image
+
+    Returns a dict with width and height (after EXIF rotation), color as a
+    '#rrggbb' string and placeholder as a data URI of a tiny WebP thumbnail.
+    """
+    with Image.open(fileobj) as source:
+        width, height = source.size
+        if (source.getexif().get(0x0112) or 1) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # Only a thumbnail is needed: decode JPEGs at a fraction of their size
+        source.draft('RGB', (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+        thumbnail = _flatten(ImageOps.exif_transpose(source))
+        thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+
+    red, green, blue = thumbnail.resize((1, 1), Image.BOX).getpixel((0, 0))
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, 'WEBP', quality=40)
+
+    return {
+        'width': width,
+        'height': height,
+        'color': f'#{red:02x}{green:02x}{blue:02x}',
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    }
@@ -0,0 +1,161 @@
+"""
+Bulk agency import for the Marseille Immobilier application
+
+CSV or JSON Lines files are parsed as a stream, validated row by row and
+inserted in committed chunks with executemany, so memory use does not
+depend on the size of the file.
+"""
+
+import io
+import csv
+import json
+from app import db
+from exporter import unescape_csv_value
+from models import Agency, Plan
+from ordering import SORT_GAP, next_sort_order
+from stats import adjust_counters
+from utils import normalize_website
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Errors kept in the import report; further ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl'}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'oui', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'non', 'n', 'off'}
+
+def detect_format(filename):
+    """Get the import format of a file from its extension, or None if unsupported"""
+    filename = (filename or '').lower()
+    for extension, file_format in IMPORT_FORMATS.items():
+        if filename.endswith(extension):
+            return file_format
+    return None
+
+def iter_rows(stream, file_format):
+    """Yield (line number, row dict or None, parse error or None) from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                # Undo the formula escaping of our own CSV exports
+                row = {key: unescape_csv_value(value) for key, value in row.items()}
+                yield reader.line_num, row, None
+        else:
+            for line_number, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, None, f"invalid JSON ({e.msg})"
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, None, "expected a JSON object"
+                    continue
+                yield line_number, row, None
+    finally:
+        # Leave the underlying stream open for its owner
+        text.detach()
+
+def _text(row, field):
+    """Get a stripped text field of a row"""
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+def validate_row(row, plan_ids):
+    """Convert an import row into Agency column values
+
+    Returns (values, None) or (None, error message).
+    """
+    values = {
+        'name': _text(row, 'name'),
+        'city': _text(row, 'city'),
+        'website': normalize_website(_text(row, 'website')),
+        'description': _text(row, 'description') or None,
+    }
+    if not all([values['name'], values['city'], values['website']]):
+        return None, "name, city and website are required"
+    for field in ('name', 'city', 'website'):
+        if len(values[field]) > Agency.__table__.c[field].type.length:
+            return None, f"{field} is too long"
+
+    plan = _text(row, 'plan')
+    if plan:
+        if plan.lower() not in plan_ids:
+            return None, f"unknown plan '{plan}'"
+        values['plan_id'] = plan_ids[plan.lower()]
+    else:
+        values['plan_id'] = None
+
+    is_active = row.get('is_active', True)
+    if isinstance(is_active, str):
+        if is_active.strip().lower() in TRUE_VALUES or not is_active.strip():
+            is_active = True
+        elif is_active.strip().lower() in FALSE_VALUES:
+            is_active = False
+        else:
+            return None, f"invalid is_active value '{is_active}'"
+    values['is_active'] = bool(is_active)
+
+    return values, None
+
+def _insert_chunk(rows):
+    """Insert a chunk of agencies with one executemany and commit it"""
+    db.session.execute(db.insert(Agency), rows)
+    adjust_counters(
+        total_agencies=len(rows),
+        active_agencies=sum(1 for row in rows if row['is_active'])
+    )
+    db.session.commit()
+
+def import_agencies(stream, file_format, chunk_size=IMPORT_CHUNK_SIZE, progress=None, dry_run=False):
+    """Import agencies from a CSV or JSON Lines binary stream
+
+    Columns: name, city, website (required), description, plan (plan name)
+    and is_active. Websites get the same https:// rule as the admin form.
+    Valid rows are appended after the existing agencies and committed every
+    chunk_size rows; progress, if given, is called with the report after
+    each chunk. Returns the report: {'read', 'imported', 'failed', 'errors'}
+    with errors as (line number, message) pairs.
+    """
+    plan_ids = {name.lower(): plan_id for plan_id, name in db.session.execute(db.select(Plan.id, Plan.name))}
+    sort_order = next_sort_order(Agency)
+
+    report = {'read': 0, 'imported': 0, 'failed': 0, 'errors': []}
+    chunk = []
+
+    for line_number, row, error in iter_rows(stream, file_format):
+        report['read'] += 1
+        values = None
+        if error is None:
+            values, error = validate_row(row, plan_ids)
+        if error:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append((line_number, error))
+            continue
+
+        values['sort_order'] = sort_order
+        sort_order += SORT_GAP
+        chunk.append(values)
+
+        if len(chunk) >= chunk_size:
+            if not dry_run:
+                _insert_chunk(chunk)
+            report['imported'] += len(chunk)
+            chunk = []
+            if progress:
+                progress(report)
+
+    if chunk:
+        if not dry_run:
+            _insert_chunk(chunk)
+        report['imported'] += len(chunk)
+        if progress:
+            progress(report)
+
+    return report
@@ -0,0 +1,86 @@
+"""
+Background jobs for the Marseille Immobilier application
+
+Jobs run in a per-process thread pool, created lazily so that every
+gunicorn worker gets its own pool after forking. Each job runs inside an
+application context with its own database session.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(workers):
+    """Get the worker pool of this process, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs')
+        return _executor
+
+def _run_job(app, func, args):
+    """Run a job inside an application context, logging any failure"""
+    with app.app_context():
+        try:
+            func(*args)
+        except Exception as e:
+            app.logger.error(f"Background job {func.__name__}{args} failed: {e}")
+
+def submit_job(func, *args):
+    """Queue a function for the background worker pool
+
+    With BACKGROUND_WORKERS set to 0 the job runs immediately instead.
+    """
+    app = current_app._get_current_object()
+    workers = app.config.get('BACKGROUND_WORKERS', 2)
+    if workers <= 0:
+        _run_job(app, func, args)
+        return
+    _get_executor(workers).submit(_run_job, app, func, args)
+
+def start_periodic_job(func, interval, *args):
+    """Run a function every interval seconds in a daemon thread of this process"""
+    app = current_app._get_current_object()
+    
+    def loop():
+        while True:
+            time.sleep(interval)
+            _run_job(app, func, args)
+    
+    threading.Thread(target=loop, name=f'periodic-{func.__name__}', daemon=True).start()
+
+def process_agency_image(image_id):
+    """Generate the resized variants of a gallery image and record the outcome"""
+    from app import db
+    from cache import invalidate_pages
+    from models import AgencyImage
+    from storage import ensure_variants, read_stored_image_metadata, set_image_metadata
+
+    image = db.session.get(AgencyImage, image_id)
+    if image is None or image.processing_status != 'pending':
+        return
+
+    try:
+        image.image_variants = ensure_variants(image.image_filename, 'agencies')
+        set_image_metadata(image, 'image', read_stored_image_metadata(image.image_filename, 'agencies'))
+        image.processing_status = 'ready'
+    except Exception as e:
+        current_app.logger.error(f"Error processing agency image {image_id}: {e}")
+        image.image_variants = False
+        image.processing_status = 'failed'
+    db.session.commit()
+
+    # Pages rendered while images were pending do not list their variants:
+    # refresh them once the agency's last pending image is processed
+    still_pending = db.session.execute(
+        db.select(AgencyImage.id).where(
+            AgencyImage.agency_id == image.agency_id,
+            AgencyImage.processing_status == 'pending'
+        ).limit(1)
+    ).first()
+    if still_pending is None:
+        invalidate_pages()
@@ -27,11 +27,24 @@ from admin_routes import admin_bp
 app.register_blueprint(main_bp)
 app.register_blueprint(admin_bp, url_prefix='/admin')
 
+# Register CLI commands
+import commands  # noqa: F401
+
 # Auto-initialize the application on startup
 with app.app_context():
     from auto_setup import initialize_application
     initialize_application()
 
+    # Load translations once per worker, before the first request
+    from i18n import preload_catalog
+    preload_catalog()
+
+    # Periodically remove upload files no longer referenced by any record
+    if app.config['STORAGE_GC_INTERVAL'] > 0:
+        from jobs import start_periodic_job
+        from storage import run_scheduled_garbage_collection
+        start_periodic_job(run_scheduled_garbage_collection, app.config['STORAGE_GC_INTERVAL'])
+
 if __name__ == '__main__':
     # Start the Flask development server
     app.run(host='0.0.0.0', port=5000, debug=True)
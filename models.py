@@ -33,12 +33,15 @@ class Plan(db.Model):
     price = db.Column(db.Float, nullable=False)
     billing_period = db.Column(db.String(10), default='monthly')  # 'monthly' or 'yearly'
     description = db.Column(db.Text)
+    tier = db.Column(db.Integer, nullable=False, default=0)  # Higher tiers are listed first
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship
     agencies = db.relationship('Agency', backref='plan', lazy=True)
     
+    __table_args__ = (db.Index('ix_plan_tier', 'tier', 'id'),)
+    
     def __repr__(self):
         return f'<Plan {self.name}>'
 
@@ -50,6 +53,16 @@ class Agency(db.Model):
     website = db.Column(db.String(200), nullable=False)
     logo_filename = db.Column(db.String(200))
     cover_filename = db.Column(db.String(200))
+    # Intrinsic sizes, dominant color and inline placeholder, computed at upload
+    logo_width = db.Column(db.Integer)
+    logo_height = db.Column(db.Integer)
+    cover_width = db.Column(db.Integer)
+    cover_height = db.Column(db.Integer)
+    cover_color = db.Column(db.String(7))
+    cover_placeholder = db.Column(db.Text)
+    # Whether the resized variants listed in srcset attributes are stored
+    logo_variants = db.Column(db.Boolean, nullable=False, default=False)
+    cover_variants = db.Column(db.Boolean, nullable=False, default=False)
     description = db.Column(db.Text)
     plan_id = db.Column(db.Integer, db.ForeignKey('plan.id'), nullable=True)
     is_active = db.Column(db.Boolean, default=True)
@@ -57,6 +70,9 @@ class Agency(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Serves the public listing: active agencies per plan, in sort order
+    __table_args__ = (db.Index('ix_agency_listing', 'is_active', 'plan_id', 'sort_order'),)
+    
     def __repr__(self):
         return f'<Agency {self.name}>'
 
@@ -71,6 +87,12 @@ class ContactMessage(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
     
+    # Serve the inbox, newest first, and its unread view
+    __table_args__ = (
+        db.Index('ix_contact_message_created', 'created_at', 'id'),
+        db.Index('ix_contact_message_unread', 'is_read', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<ContactMessage from {self.email}>'
 
@@ -104,6 +126,11 @@ class CarouselItem(db.Model):
     """Carousel items (images with optional links)"""
     id = db.Column(db.Integer, primary_key=True)
     image_filename = db.Column(db.String(200), nullable=False)
+    image_width = db.Column(db.Integer)
+    image_height = db.Column(db.Integer)
+    image_color = db.Column(db.String(7))
+    image_placeholder = db.Column(db.Text)
+    image_variants = db.Column(db.Boolean, nullable=False, default=False)
     link_url = db.Column(db.String(500))
     alt_text = db.Column(db.String(200))
     is_active = db.Column(db.Boolean, default=True)
@@ -119,9 +146,15 @@ class AgencyImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     agency_id = db.Column(db.Integer, db.ForeignKey('agency.id'), nullable=False)
     image_filename = db.Column(db.String(200), nullable=False)
+    image_width = db.Column(db.Integer)
+    image_height = db.Column(db.Integer)
+    image_color = db.Column(db.String(7))
+    image_placeholder = db.Column(db.Text)
+    image_variants = db.Column(db.Boolean, nullable=False, default=False)
     alt_text = db.Column(db.String(200))
     is_primary = db.Column(db.Boolean, default=False)  # Main image for the agency
     sort_order = db.Column(db.Integer, default=0)
+    processing_status = db.Column(db.String(20), nullable=False, default='ready')  # 'pending', 'ready' or 'failed'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship
@@ -129,3 +162,35 @@ class AgencyImage(db.Model):
     
     def __repr__(self):
         return f'<AgencyImage {self.id} for Agency {self.agency_id}>'
+
+class CacheGeneration(db.Model):
+    """Named generation counters used to invalidate in-process caches"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CacheGeneration {self.name}={self.value}>'
+
+class StatCounter(db.Model):
+    """Incrementally maintained counters shown on the admin dashboard"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
+
+class StoredFile(db.Model):
+    """Content-addressed upload and the number of rows referencing it"""
+    id = db.Column(db.Integer, primary_key=True)
+    subfolder = db.Column(db.String(20), nullable=False)
+    filename = db.Column(db.String(200), nullable=False)
+    size = db.Column(db.Integer)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('subfolder', 'filename'),)
+    
+    def __repr__(self):
+        return f'<StoredFile {self.subfolder}/{self.filename} ({self.ref_count})>'
@@ -0,0 +1,98 @@
+"""
+Sort order maintenance for agencies, carousel items and gallery images
+
+Positions are spaced SORT_GAP apart so that moving a single row usually
+only rewrites that row; full reorders are applied with one UPDATE.
+"""
+
+from sqlalchemy import and_, case, or_
+from app import db
+from utils import parse_id_list
+
+SORT_GAP = 1024
+
+def apply_order(model, ids, scope=()):
+    """Give the listed rows increasing positions in one UPDATE
+
+    The IDs are validated with a single query: unknown IDs and rows outside
+    the scope conditions are ignored. Returns the number of rows reordered.
+    """
+    requested = parse_id_list(ids)
+    if not requested:
+        return 0
+
+    valid = set(db.session.execute(
+        db.select(model.id).where(model.id.in_(requested), *scope)
+    ).scalars())
+    ordered = [item_id for item_id in requested if item_id in valid]
+    if not ordered:
+        return 0
+
+    positions = case(
+        {item_id: index * SORT_GAP for index, item_id in enumerate(ordered)},
+        value=model.id
+    )
+    db.session.execute(
+        db.update(model).where(model.id.in_(ordered)).values(sort_order=positions),
+        execution_options={'synchronize_session': False}
+    )
+    return len(ordered)
+
+def next_sort_order(model, scope=()):
+    """Get the position placing a new row after every existing one"""
+    last = db.session.execute(db.select(db.func.max(model.sort_order)).where(*scope)).scalar()
+    return SORT_GAP if last is None else last + SORT_GAP
+
+def move_item(model, item_id, before_id=None, scope=()):
+    """Move one row just before another one, or to the end when before_id is None
+
+    Only the moved row is rewritten, unless there is no room left between
+    its new neighbours; the scope is then renumbered in one UPDATE.
+    Returns False when either row does not exist within the scope.
+    """
+    exists = db.session.execute(
+        db.select(model.id).where(model.id == item_id, *scope)
+    ).scalar()
+    if exists is None:
+        return False
+
+    others = [model.id != item_id, *scope]
+    if before_id is None:
+        position = next_sort_order(model, others)
+    else:
+        before = db.session.execute(
+            db.select(model.sort_order, model.id).where(model.id == before_id, *others)
+        ).first()
+        if before is None:
+            return False
+        before_order = before.sort_order or 0
+
+        # The row currently listed just before the target
+        previous = db.session.execute(
+            db.select(model.sort_order).where(
+                *others,
+                or_(
+                    model.sort_order < before_order,
+                    and_(model.sort_order == before_order, model.id < before.id)
+                )
+            ).order_by(model.sort_order.desc(), model.id.desc()).limit(1)
+        ).scalar()
+
+        if previous is None:
+            position = before_order - SORT_GAP
+        elif before_order - previous >= 2:
+            position = previous + (before_order - previous) // 2
+        else:
+            # No free key between the neighbours: renumber the whole scope
+            ids = list(db.session.execute(
+                db.select(model.id).where(*others).order_by(model.sort_order, model.id)
+            ).scalars())
+            ids.insert(ids.index(before.id), item_id)
+            apply_order(model, ids, scope)
+            return True
+
+    db.session.execute(
+        db.update(model).where(model.id == item_id).values(sort_order=position),
+        execution_options={'synchronize_session': False}
+    )
+    return True
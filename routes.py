@@ -4,25 +4,115 @@ Public routes for the Marseille Immobilier application
 
 import os
 import json
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, make_response, send_from_directory
+import base64
+import mimetypes
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, make_response, send_from_directory, jsonify
 from flask_mail import Message
-from models import Agency, ContactMessage, Translation, CarouselSettings, CarouselItem
+from sqlalchemy import and_, or_
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from sqlalchemy.orm import contains_eager, selectinload
+from models import Agency, ContactMessage, Translation, CarouselSettings, CarouselItem, Plan
 from app import db
-from utils import get_translation, get_available_languages, send_contact_email
+from cache import cached_page, conditional_page
+from stats import adjust_counters
+from search import search_agencies
+from storage_backends import get_storage
+from utils import get_translation, get_available_languages, get_i18n_context, send_contact_email, get_file_url, get_srcset, get_placeholder_style
 
 main_bp = Blueprint('main', __name__)
 
+# Upload names are derived from their content, so a URL never changes content
+UPLOAD_MAX_AGE = 365 * 24 * 60 * 60
+
+# Lifetime of the signed URLs /uploads redirects to with a remote storage backend
+UPLOAD_SIGNED_URL_EXPIRY = 3600
+
+# Number of agencies per page on the homepage and in /api/agencies
+AGENCIES_PAGE_SIZE = 24
+AGENCIES_MAX_PAGE_SIZE = 100
+
+def encode_agency_cursor(agency):
+    """Encode the listing position of an agency as an opaque cursor token"""
+    position = [agency.plan.tier, agency.plan_id, agency.sort_order or 0, agency.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_agency_cursor(token):
+    """Decode a cursor token, raising ValueError if it is malformed"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(position, list) or len(position) != 4 or not all(isinstance(v, int) for v in position):
+        raise ValueError('Invalid cursor')
+    return position
+
+def get_agencies_page(cursor=None, limit=AGENCIES_PAGE_SIZE, with_images=False):
+    """Get one page of active agencies after a cursor, and the cursor of the next page
+
+    Agencies are ordered by plan tier (Premium first), then by sort_order. The
+    page is selected with a keyset condition on (tier, plan_id, sort_order, id),
+    which the listing indexes serve directly, so deep pages cost the same as
+    the first one.
+    """
+    query = Agency.query.join(Plan).options(contains_eager(Agency.plan)).filter(Agency.is_active == True)
+    if with_images:
+        query = query.options(selectinload(Agency.images))
+    
+    if cursor:
+        tier, plan_id, sort_order, agency_id = decode_agency_cursor(cursor)
+        query = query.filter(or_(
+            Plan.tier < tier,
+            and_(Plan.tier == tier, or_(
+                Plan.id < plan_id,
+                and_(Plan.id == plan_id, or_(
+                    Agency.sort_order > sort_order,
+                    and_(Agency.sort_order == sort_order, Agency.id > agency_id)
+                ))
+            ))
+        ))
+    
+    agencies = query.order_by(
+        Plan.tier.desc(),
+        Plan.id.desc(),
+        Agency.sort_order.asc(),
+        Agency.id.asc()
+    ).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(agencies) > limit:
+        agencies = agencies[:limit]
+        next_cursor = encode_agency_cursor(agencies[-1])
+    return agencies, next_cursor
+
+def serialize_agency(agency):
+    """Compact JSON representation of an agency for the public API"""
+    return {
+        'id': agency.id,
+        'name': agency.name,
+        'city': agency.city,
+        'website': agency.website,
+        'description': agency.description,
+        'plan': agency.plan.name if agency.plan else None,
+        'logo': get_file_url(agency.logo_filename, 'logos'),
+        'logo_size': [agency.logo_width, agency.logo_height] if agency.logo_width else None,
+        'cover': get_file_url(agency.cover_filename, 'covers'),
+        'cover_size': [agency.cover_width, agency.cover_height] if agency.cover_width else None,
+        'cover_color': agency.cover_color,
+        'cover_placeholder': agency.cover_placeholder
+    }
+
 @main_bp.route('/')
+@conditional_page()
+@cached_page
 def index():
     """Homepage with agency listings"""
     language = session.get('language', 'fr')
     
-    # Get active agencies ordered by plan (Premium first) then by sort_order
-    from models import Plan
-    agencies = Agency.query.join(Plan).filter(Agency.is_active == True).order_by(
-        Plan.name.desc(),  # Premium before Basic (alphabetically desc)
-        Agency.sort_order.asc()
-    ).all()
+    # Only the first page is rendered; the rest comes from /api/agencies.
+    # Plans come from the join and images from one batched query, so the
+    # number of SELECTs does not grow with the number of agencies.
+    agencies, next_cursor = get_agencies_page(with_images=True)
     
     # Get all active plans for the pricing section  
     plans = Plan.query.filter_by(is_active=True).order_by(Plan.price.asc()).all()
@@ -38,12 +128,50 @@ def index():
     
     return render_template('index.html', 
                          agencies=agencies, 
+                         agencies_next_cursor=next_cursor,
                          plans=plans, 
                          language=language,
                          carousel_settings=carousel_settings,
                          carousel_items=carousel_items)
 
+@main_bp.route('/api/agencies')
+@conditional_page(per_language=False)
+def api_agencies():
+    """Paginated JSON listing of active agencies for infinite scroll"""
+    limit = max(1, min(request.args.get('limit', AGENCIES_PAGE_SIZE, type=int), AGENCIES_MAX_PAGE_SIZE))
+    
+    try:
+        agencies, next_cursor = get_agencies_page(request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+    
+    return jsonify({
+        'agencies': [serialize_agency(agency) for agency in agencies],
+        'next_cursor': next_cursor
+    })
+
+@main_bp.route('/api/search')
+@conditional_page(per_language=False)
+def api_search():
+    """Full-text search over agency names, cities and descriptions"""
+    query = request.args.get('q', '').strip()
+    city = request.args.get('city', '').strip() or None
+    limit = max(1, min(request.args.get('limit', AGENCIES_PAGE_SIZE, type=int), AGENCIES_MAX_PAGE_SIZE))
+    
+    try:
+        agencies, city_facets = search_agencies(query, city=city, limit=limit)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error searching agencies for {query!r}: {e}")
+        return jsonify({'status': 'error'}), 500
+    
+    return jsonify({
+        'agencies': [serialize_agency(agency) for agency in agencies],
+        'facets': {'city': city_facets}
+    })
+
 @main_bp.route('/contact', methods=['GET', 'POST'])
+@cached_page
 def contact():
     """Contact form page"""
     language = session.get('language', 'fr')
@@ -71,6 +199,7 @@ def contact():
         
         try:
             db.session.add(contact_message)
+            adjust_counters(total_messages=1, unread_messages=1)
             db.session.commit()
             
             # Send email notification
@@ -89,6 +218,7 @@ def contact():
     return render_template('contact.html', language=language)
 
 @main_bp.route('/privacy')
+@cached_page
 def privacy():
     """Privacy policy page"""
     language = session.get('language', 'fr')
@@ -105,6 +235,7 @@ def set_language(language):
     return redirect(request.referrer or url_for('main.index'))
 
 @main_bp.route('/robots.txt')
+@conditional_page(per_language=False)
 def robots_txt():
     """Serve robots.txt for SEO"""
     content = """User-agent: *
@@ -120,10 +251,47 @@ Sitemap: {}/sitemap.xml""".format(request.url_root.rstrip('/'))
 
 @main_bp.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    """Serve uploaded files"""
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    """Serve uploaded files with far-future caching and byte-range support"""
+    # Dot names are temporary uploads or the garbage collector's quarantine
+    if any(part.startswith('.') for part in filename.split('/')):
+        raise NotFound()
+    
+    storage = get_storage()
+    signed_url = storage.signed_url(filename, expires_in=UPLOAD_SIGNED_URL_EXPIRY)
+    if signed_url:
+        # Remote backends serve the bytes themselves
+        response = redirect(signed_url)
+        response.cache_control.private = True
+        response.cache_control.max_age = UPLOAD_SIGNED_URL_EXPIRY // 2
+        return response
+    
+    upload_dir = storage.root
+    path = safe_join(upload_dir, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    
+    # The name is the content hash (or a unique id for older uploads): a strong ETag
+    etag = os.path.splitext(os.path.basename(path))[0]
+    
+    accel_prefix = current_app.config.get('UPLOAD_ACCEL_REDIRECT')
+    if accel_prefix:
+        # Let the front proxy send the bytes (ranges included) from an internal location
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{filename}"
+        response.set_etag(etag)
+    else:
+        # Handles If-None-Match and Range requests; sends X-Sendfile when USE_X_SENDFILE is on
+        response = send_from_directory(upload_dir, filename, etag=etag, max_age=UPLOAD_MAX_AGE, conditional=True)
+    
+    response.cache_control.public = True
+    response.cache_control.max_age = UPLOAD_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 @main_bp.route('/sitemap.xml')
+@conditional_page(per_language=False)
 def sitemap_xml():
     """Serve sitemap.xml for SEO"""
     base_url = request.url_root.rstrip('/')
@@ -163,10 +331,9 @@ def sitemap_xml():
 # Template context processors
 @main_bp.app_context_processor
 def inject_globals():
-    """Inject global variables into templates"""
-    language = session.get('language', 'fr')
-    return {
-        'get_translation': get_translation,
-        'current_language': language,
-        'available_languages': get_available_languages()
-    }
+    """Inject global variables into templates (public and admin pages)"""
+    context = get_i18n_context()
+    context['get_file_url'] = get_file_url
+    context['get_srcset'] = get_srcset
+    context['get_placeholder_style'] = get_placeholder_style
+    return context
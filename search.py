@@ -0,0 +1,160 @@
+"""
+Full-text agency search for the Marseille Immobilier application
+
+On SQLite agencies are indexed in an FTS5 table kept in sync by triggers;
+on PostgreSQL a generated tsvector column with a GIN index is used instead.
+Both are maintained by the database itself, so every write path (admin
+forms, bulk operations, imports) keeps the index current.
+"""
+
+import re
+import logging
+from app import db
+from models import Agency, Plan
+from sqlalchemy.orm import contains_eager
+
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS agency_fts USING fts5(
+        name, city, description,
+        content='agency', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS agency_fts_insert AFTER INSERT ON agency BEGIN
+        INSERT INTO agency_fts(rowid, name, city, description)
+        VALUES (new.id, new.name, new.city, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS agency_fts_delete AFTER DELETE ON agency BEGIN
+        INSERT INTO agency_fts(agency_fts, rowid, name, city, description)
+        VALUES ('delete', old.id, old.name, old.city, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS agency_fts_update AFTER UPDATE OF name, city, description ON agency BEGIN
+        INSERT INTO agency_fts(agency_fts, rowid, name, city, description)
+        VALUES ('delete', old.id, old.name, old.city, old.description);
+        INSERT INTO agency_fts(rowid, name, city, description)
+        VALUES (new.id, new.name, new.city, new.description);
+    END""",
+]
+
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE agency ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(city, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_agency_search ON agency USING GIN (search_vector)",
+]
+
+# BM25 column weights for name, city and description
+SQLITE_RANK = 'bm25(agency_fts, 10.0, 5.0, 1.0)'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def search_backend():
+    """Get the search implementation for the configured database"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return 'postgres'
+    if dialect == 'sqlite':
+        return 'fts5'
+    return 'like'
+
+def ensure_search_index():
+    """Create the search index and its sync triggers if they do not exist"""
+    logger = logging.getLogger(__name__)
+    backend = search_backend()
+
+    if backend == 'fts5':
+        inspector = db.inspect(db.engine)
+        created = 'agency_fts' not in inspector.get_table_names()
+        for statement in SQLITE_SEARCH_DDL:
+            db.session.execute(db.text(statement))
+        if created:
+            rebuild_search_index()
+            logger.info("Created FTS5 agency search index")
+    elif backend == 'postgres':
+        for statement in POSTGRES_SEARCH_DDL:
+            db.session.execute(db.text(statement))
+    db.session.commit()
+
+def rebuild_search_index():
+    """Re-index every agency from the agency table"""
+    if search_backend() == 'fts5':
+        db.session.execute(db.text("INSERT INTO agency_fts(agency_fts) VALUES ('rebuild')"))
+        db.session.commit()
+
+def _query_tokens(text):
+    """Split a user query into plain word tokens"""
+    return _TOKEN_RE.findall(text or '')[:10]
+
+def _match_clause(tokens):
+    """Build the FROM clause, match condition, ranking and parameters for a query"""
+    backend = search_backend()
+
+    if backend == 'fts5':
+        # Quoted tokens cannot be parsed as FTS5 operators; the last one is a prefix
+        match = ' '.join(f'"{token}"' for token in tokens[:-1])
+        match = f'{match} "{tokens[-1]}"*'.strip()
+        return (
+            'agency_fts JOIN agency ON agency.id = agency_fts.rowid',
+            'agency_fts MATCH :match',
+            SQLITE_RANK,
+            {'match': match}
+        )
+
+    if backend == 'postgres':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        return (
+            'agency',
+            "agency.search_vector @@ to_tsquery('simple', :tsquery)",
+            "ts_rank(agency.search_vector, to_tsquery('simple', :tsquery)) DESC",
+            {'tsquery': tsquery}
+        )
+
+    conditions = []
+    params = {}
+    for i, token in enumerate(tokens):
+        params[f'like_{i}'] = f'%{token}%'
+        conditions.append(
+            f'(agency.name LIKE :like_{i} OR agency.city LIKE :like_{i} OR agency.description LIKE :like_{i})'
+        )
+    return 'agency', ' AND '.join(conditions), 'agency.sort_order', params
+
+def search_agencies(text, city=None, limit=20):
+    """Search active agencies, best matches first
+
+    Returns the matching agencies (with their plan loaded) and the number of
+    matches per city, computed before the city filter is applied.
+    """
+    tokens = _query_tokens(text)
+    if not tokens:
+        return [], {}
+
+    from_clause, condition, rank, params = _match_clause(tokens)
+
+    facet_rows = db.session.execute(
+        db.text(
+            f'SELECT agency.city, COUNT(*) FROM {from_clause} WHERE agency.is_active = :active AND {condition} '
+            'GROUP BY agency.city ORDER BY COUNT(*) DESC, agency.city'
+        ),
+        dict(params, active=True)
+    ).all()
+    city_facets = {row[0]: row[1] for row in facet_rows}
+
+    city_condition = ' AND agency.city = :city' if city else ''
+    ranked_ids = db.session.execute(
+        db.text(
+            f'SELECT agency.id FROM {from_clause} WHERE agency.is_active = :active AND {condition}{city_condition} '
+            f'ORDER BY {rank}, agency.id LIMIT :limit'
+        ),
+        dict(params, active=True, city=city, limit=limit)
+    ).scalars().all()
+
+    if not ranked_ids:
+        return [], city_facets
+
+    agencies = Agency.query.outerjoin(Plan).options(contains_eager(Agency.plan)).filter(
+        Agency.id.in_(ranked_ids)
+    ).all()
+    position = {agency_id: i for i, agency_id in enumerate(ranked_ids)}
+    agencies.sort(key=lambda agency: position[agency.id])
+    return agencies, city_facets
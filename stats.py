@@ -0,0 +1,61 @@
+"""
+Admin statistics for the Marseille Immobilier application
+
+Dashboard counters live in the stat_counter table and are adjusted in the
+same transaction as the writes they count, so reading them costs a single
+small query whatever the size of the agency and message tables.
+"""
+
+import logging
+from app import db
+from models import Agency, ContactMessage, StatCounter
+
+COUNTERS = ('total_agencies', 'active_agencies', 'total_messages', 'unread_messages')
+
+def compute_stats():
+    """Count agencies and messages from their tables in one aggregate query"""
+    agencies = db.select(
+        db.func.count().label('total'),
+        db.func.count(db.case((Agency.is_active.is_(True), 1))).label('active')
+    ).select_from(Agency).subquery()
+    messages = db.select(
+        db.func.count().label('total'),
+        db.func.count(db.case((ContactMessage.is_read.is_(False), 1))).label('unread')
+    ).select_from(ContactMessage).subquery()
+
+    row = db.session.execute(
+        db.select(agencies.c.total, agencies.c.active, messages.c.total, messages.c.unread)
+        .select_from(agencies.join(messages, db.true()))
+    ).one()
+    return dict(zip(COUNTERS, row))
+
+def rebuild_counters():
+    """Recompute every counter from the tables and store them"""
+    values = compute_stats()
+    db.session.execute(db.delete(StatCounter))
+    db.session.execute(db.insert(StatCounter), [{'name': name, 'value': value} for name, value in values.items()])
+    db.session.commit()
+    logging.getLogger(__name__).info(f"Rebuilt dashboard counters: {values}")
+    return values
+
+def adjust_counters(**deltas):
+    """Add deltas to counters as part of the current transaction
+
+    Example: adjust_counters(total_messages=1, unread_messages=1)
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    db.session.execute(
+        db.update(StatCounter)
+        .where(StatCounter.name.in_(deltas))
+        .values(value=StatCounter.value + db.case(deltas, value=StatCounter.name)),
+        execution_options={'synchronize_session': False}
+    )
+
+def get_stats():
+    """Get the dashboard counters, computing them on first use"""
+    values = dict(db.session.execute(db.select(StatCounter.name, StatCounter.value)).all())
+    if any(name not in values for name in COUNTERS):
+        values = rebuild_counters()
+    return {name: values[name] for name in COUNTERS}
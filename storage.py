@@ -0,0 +1,467 @@
+"""
+Content-addressed upload storage for the Marseille Immobilier application
+
+Uploads are named after the SHA-256 of their content, so identical files
+uploaded to the same folder are stored once. A StoredFile row counts the
+model columns referencing each file; reference changes are part of the
+caller's transaction, and a file is only removed from storage once the
+transaction dropping its last reference has committed.
+"""
+
+import os
+import time
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+import hashlib
+import tempfile
+from contextlib import closing
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.utils import secure_filename
+from app import db
+from images import RASTER_EXTENSIONS, has_metadata, has_variants, read_image_metadata, render_variants, variant_filenames, variant_source_stem
+from models import Agency, AgencyImage, CarouselItem, CarouselSettings, StoredFile
+from storage_backends import CHUNK_SIZE, TEMP_PREFIX, get_storage
+
+# Uploads larger than this are hashed through a temporary file instead of memory
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Filenames per IN (...) list when releasing many references at once
+RELEASE_BATCH_SIZE = 500
+
+# Storage folder receiving quarantined orphans (never served)
+QUARANTINE_FOLDER = '.quarantine'
+
+# Lock file letting a single worker process run the periodic garbage collection
+GC_LOCK_FILE = '.gc.lock'
+
+# Per-image columns filled from read_image_metadata, named '<prefix>_<field>'
+IMAGE_METADATA_FIELDS = ('width', 'height', 'color', 'placeholder')
+
+# Images with stored metadata: model, filename column, folder and column prefix
+IMAGE_RECORDS = (
+    (Agency, Agency.logo_filename, 'logos', 'logo'),
+    (Agency, Agency.cover_filename, 'covers', 'cover'),
+    (AgencyImage, AgencyImage.image_filename, 'agencies', 'image'),
+    (CarouselItem, CarouselItem.image_filename, 'carousel', 'image'),
+)
+
+# Model columns holding upload filenames, with the folder they live in
+FILE_REFERENCES = (
+    (Agency.logo_filename, 'logos'),
+    (Agency.cover_filename, 'covers'),
+    (AgencyImage.image_filename, 'agencies'),
+    (CarouselItem.image_filename, 'carousel'),
+    (CarouselSettings.video_filename, 'carousel'),
+)
+
+def _pending_deletes(session):
+    """Get the files to delete once the session's transaction commits"""
+    return session.info.setdefault('pending_file_deletes', set())
+
+def store_file(file, subfolder):
+    """Stream an uploaded file to storage under its content hash
+
+    Returns (filename, created); created is False when identical content was
+    already stored. The new reference is added to the current transaction
+    before the file is looked up, so a concurrent release of its last
+    reference either waits on the StoredFile row or sees the reference when
+    re-checking before deletion.
+    """
+    storage = get_storage()
+    extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+    digest = hashlib.sha256()
+    size = 0
+
+    # The name is only known once the whole upload has been hashed
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+
+        filename = f'{digest.hexdigest()[:32]}{extension}'
+        add_reference(filename, subfolder, size)
+
+        key = f'{subfolder}/{filename}'
+        created = not storage.exists(key)
+        if created:
+            spool.seek(0)
+            storage.save(key, spool)
+
+    return filename, created
+
+def store_variants(filename, subfolder):
+    """Generate the resized variants of a stored image and store them next to it"""
+    storage = get_storage()
+    with closing(storage.open(f'{subfolder}/{filename}')) as source:
+        variants = render_variants(source, filename)
+    for name, buffer in variants:
+        storage.save(f'{subfolder}/{name}', buffer)
+
+def variants_stored(filename, subfolder):
+    """Check whether every resized variant of an image is stored"""
+    storage = get_storage()
+    return has_variants(filename, subfolder) and all(
+        storage.exists(f'{subfolder}/{name}') for name in variant_filenames(filename)
+    )
+
+def ensure_variants(filename, subfolder, force=False):
+    """Generate the variants of a stored image unless they all exist already
+
+    Returns whether the image has variants; generation errors are raised.
+    """
+    if not has_variants(filename, subfolder):
+        return False
+    if force or not variants_stored(filename, subfolder):
+        store_variants(filename, subfolder)
+    return True
+
+def read_stored_image_metadata(filename, subfolder):
+    """Compute the dimensions, dominant color and placeholder of a stored image
+
+    Returns None for files that are not raster images or cannot be read.
+    """
+    if not filename or not has_metadata(filename):
+        return None
+    try:
+        with closing(get_storage().open(f'{subfolder}/{filename}')) as source:
+            return read_image_metadata(source)
+    except Exception as e:
+        current_app.logger.error(f"Error reading image metadata for {subfolder}/{filename}: {e}")
+        return None
+
+def set_image_metadata(record, prefix, metadata):
+    """Copy image metadata onto a record's '<prefix>_<field>' columns, skipping missing ones"""
+    for field in IMAGE_METADATA_FIELDS:
+        column = f'{prefix}_{field}'
+        if hasattr(record, column):
+            setattr(record, column, metadata.get(field) if metadata else None)
+
+def add_reference(filename, subfolder, size=None):
+    """Count one more reference to a stored file"""
+    _pending_deletes(db.session()).discard((subfolder, filename))
+
+    result = db.session.execute(
+        db.update(StoredFile)
+        .where(StoredFile.subfolder == subfolder, StoredFile.filename == filename)
+        .values(ref_count=StoredFile.ref_count + 1)
+    )
+    if result.rowcount == 0:
+        db.session.execute(db.insert(StoredFile).values(
+            subfolder=subfolder, filename=filename, size=size, ref_count=1
+        ))
+
+def release_reference(filename, subfolder):
+    """Drop one reference to a stored file, deleting it after commit when unused"""
+    release_references([(subfolder, filename)])
+
+def release_references(files):
+    """Drop one reference per (subfolder, filename) pair, deleting unused files after commit
+
+    References are released with a few set-based statements per folder,
+    whatever the number of files. Files stored before reference counting
+    have no StoredFile row and are treated as having a single reference.
+    """
+    released = defaultdict(Counter)
+    for subfolder, filename in files:
+        if filename:
+            released[subfolder][filename] += 1
+
+    pending = _pending_deletes(db.session())
+    for subfolder, counts in released.items():
+        names = list(counts)
+        for start in range(0, len(names), RELEASE_BATCH_SIZE):
+            batch = names[start:start + RELEASE_BATCH_SIZE]
+            condition = (StoredFile.subfolder == subfolder, StoredFile.filename.in_(batch))
+
+            db.session.execute(
+                db.update(StoredFile).where(*condition).values(
+                    ref_count=StoredFile.ref_count - db.case({name: counts[name] for name in batch}, value=StoredFile.filename)
+                ),
+                execution_options={'synchronize_session': False}
+            )
+            remaining = dict(db.session.execute(
+                db.select(StoredFile.filename, StoredFile.ref_count).where(*condition)
+            ).all())
+
+            unused = [name for name in batch if remaining.get(name, 0) <= 0]
+            if not unused:
+                continue
+            db.session.execute(
+                db.delete(StoredFile).where(StoredFile.subfolder == subfolder, StoredFile.filename.in_(unused)),
+                execution_options={'synchronize_session': False}
+            )
+            pending.update((subfolder, name) for name in unused)
+
+def delete_stored_file(filename, subfolder):
+    """Remove a file and its resized variants from storage"""
+    storage = get_storage()
+    filenames = [filename]
+    if has_variants(filename, subfolder):
+        filenames += variant_filenames(filename)
+
+    for name in filenames:
+        storage.delete(f'{subfolder}/{name}')
+
+def _referenced_files(connection, files):
+    """Get the (subfolder, filename) pairs among files that have references again"""
+    names = defaultdict(list)
+    for subfolder, filename in files:
+        names[subfolder].append(filename)
+
+    referenced = set()
+    for subfolder, filenames in names.items():
+        for start in range(0, len(filenames), RELEASE_BATCH_SIZE):
+            rows = connection.execute(
+                db.select(StoredFile.filename).where(
+                    StoredFile.subfolder == subfolder,
+                    StoredFile.filename.in_(filenames[start:start + RELEASE_BATCH_SIZE]),
+                    StoredFile.ref_count > 0
+                )
+            )
+            referenced.update((subfolder, filename) for filename, in rows)
+    return referenced
+
+@event.listens_for(Session, 'after_commit')
+def _delete_released_files(session):
+    """Remove files whose last reference was dropped by the committed transaction"""
+    pending = session.info.pop('pending_file_deletes', None)
+    if not pending:
+        return
+
+    # Another transaction may have reused a file since its reference was
+    # released, so only files still unreferenced once committed are deleted
+    try:
+        with db.engine.connect() as connection:
+            pending -= _referenced_files(connection, pending)
+    except Exception as e:
+        current_app.logger.error(f"Error checking released files before deletion: {e}")
+        return
+
+    for subfolder, filename in pending:
+        try:
+            delete_stored_file(filename, subfolder)
+        except Exception as e:
+            current_app.logger.error(f"Error deleting {subfolder}/{filename}: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def _keep_released_files(session):
+    """Forget deletions planned by a transaction that was rolled back"""
+    session.info.pop('pending_file_deletes', None)
+
+def count_references():
+    """Count the references to every upload from the model columns"""
+    references = Counter()
+    for column, subfolder in FILE_REFERENCES:
+        rows = db.session.execute(
+            db.select(column, db.func.count()).where(column.isnot(None)).group_by(column)
+        )
+        for filename, count in rows:
+            references[(subfolder, filename)] += count
+    return references
+
+def rebuild_references():
+    """Recompute every StoredFile row from the model columns"""
+    references = count_references()
+    storage = get_storage()
+
+    rows = []
+    for (subfolder, filename), count in references.items():
+        size = storage.size(f'{subfolder}/{filename}')
+        rows.append({'subfolder': subfolder, 'filename': filename, 'size': size, 'ref_count': count})
+
+    db.session.execute(db.delete(StoredFile))
+    if rows:
+        db.session.execute(db.insert(StoredFile), rows)
+    db.session.commit()
+    return len(rows)
+
+def backfill_image_metadata(batch_size=200, force=False):
+    """Compute the image metadata missing from existing records
+
+    Records are walked in primary key order, one committed batch at a time;
+    files shared by several records are only read once. Returns the number
+    of records updated.
+    """
+    updated = 0
+    for model, column, subfolder, prefix in IMAGE_RECORDS:
+        width_column = getattr(model, f'{prefix}_width')
+        computed = {}
+        last_id = 0
+        while True:
+            query = model.query.filter(model.id > last_id, column.isnot(None))
+            if not force:
+                query = query.filter(width_column.is_(None))
+            records = query.order_by(model.id).limit(batch_size).all()
+            if not records:
+                break
+
+            for record in records:
+                filename = getattr(record, column.key)
+                if filename not in computed:
+                    computed[filename] = read_stored_image_metadata(filename, subfolder)
+                if computed[filename]:
+                    set_image_metadata(record, prefix, computed[filename])
+                    updated += 1
+            db.session.commit()
+            last_id = records[-1].id
+    return updated
+
+def backfill_image_variants(batch_size=200, force=False):
+    """Generate the variants missing from existing images and record them
+
+    Records are walked like in backfill_image_metadata; gallery images still
+    waiting for the background worker are left to it, and failed ones are
+    marked ready once their variants exist. Returns the number of records
+    updated.
+    """
+    updated = 0
+    for model, column, subfolder, prefix in IMAGE_RECORDS:
+        variants_column = getattr(model, f'{prefix}_variants')
+        generated = {}
+        last_id = 0
+        while True:
+            query = model.query.filter(model.id > last_id, column.isnot(None))
+            if not force:
+                query = query.filter(variants_column.is_(False))
+            if model is AgencyImage:
+                query = query.filter(AgencyImage.processing_status != 'pending')
+            records = query.order_by(model.id).limit(batch_size).all()
+            if not records:
+                break
+
+            for record in records:
+                filename = getattr(record, column.key)
+                if filename not in generated:
+                    try:
+                        generated[filename] = ensure_variants(filename, subfolder, force)
+                    except Exception as e:
+                        current_app.logger.error(f"Error generating variants for {subfolder}/{filename}: {e}")
+                        generated[filename] = False
+                if generated[filename]:
+                    setattr(record, variants_column.key, True)
+                    if model is AgencyImage:
+                        record.processing_status = 'ready'
+                    updated += 1
+            db.session.commit()
+            last_id = records[-1].id
+    return updated
+
+def referenced_filenames():
+    """Get the referenced upload names of every folder, variants included
+
+    Filenames are streamed from the model columns rather than loaded as rows.
+    """
+    referenced = defaultdict(set)
+    for column, subfolder in FILE_REFERENCES:
+        names = referenced[subfolder]
+        rows = db.session.execute(
+            db.select(column).where(column.isnot(None)).distinct().execution_options(yield_per=1000)
+        ).scalars()
+        for filename in rows:
+            names.add(filename)
+            if has_variants(filename, subfolder):
+                names.update(variant_filenames(filename))
+    return referenced
+
+def _remove_orphans(subfolder, names, quarantine):
+    """Delete a batch of orphaned files, or move them to the quarantine folder"""
+    storage = get_storage()
+
+    # Skip files referenced by a transaction committed since the scan started,
+    # and the variants of such files, which a re-upload does not regenerate
+    sources = {name: variant_source_stem(name) for name in names}
+    candidates = set(names)
+    for stem in set(sources.values()) - {None}:
+        candidates.update(f'{stem}.{extension}' for extension in RASTER_EXTENSIONS)
+    claimed = set(db.session.execute(
+        db.select(StoredFile.filename).where(
+            StoredFile.subfolder == subfolder, StoredFile.filename.in_(candidates)
+        )
+    ).scalars())
+    claimed_stems = {os.path.splitext(filename)[0] for filename in claimed}
+
+    removed = 0
+    for name in names:
+        if name in claimed or sources[name] in claimed_stems:
+            continue
+        key = f'{subfolder}/{name}'
+        try:
+            if quarantine:
+                storage.move(key, f'{QUARANTINE_FOLDER}/{key}')
+            else:
+                storage.delete(key)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.error(f"Error removing orphaned upload {subfolder}/{name}: {e}")
+    return removed
+
+def collect_garbage(min_age=3600, batch_size=500, quarantine=False, dry_run=False):
+    """Remove upload files that no model references
+
+    Each folder listing is streamed from the storage backend and compared
+    against the set of referenced names (variants included). Files younger than min_age seconds
+    are kept so that uploads whose transaction has not committed yet are not
+    collected. Abandoned .upload-* temporary files are collected as well.
+
+    Returns a dict of {'scanned', 'orphaned', 'removed', 'bytes'} counts.
+    """
+    storage = get_storage()
+    referenced = referenced_filenames()
+    cutoff = time.time() - min_age
+    stats = {'scanned': 0, 'orphaned': 0, 'removed': 0, 'bytes': 0}
+
+    for subfolder in sorted({subfolder for _, subfolder in FILE_REFERENCES}):
+        names = referenced[subfolder]
+        batch = []
+        for name, size, mtime in storage.list(subfolder):
+            stats['scanned'] += 1
+            if name in names:
+                continue
+            if name.startswith('.') and not name.startswith(TEMP_PREFIX):
+                continue
+            if mtime > cutoff:
+                continue
+
+            stats['orphaned'] += 1
+            stats['bytes'] += size
+            batch.append(name)
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    stats['removed'] += _remove_orphans(subfolder, batch, quarantine)
+                batch = []
+
+        if batch and not dry_run:
+            stats['removed'] += _remove_orphans(subfolder, batch, quarantine)
+
+    return stats
+
+def run_scheduled_garbage_collection():
+    """Collect orphaned uploads unless another worker process is already doing it"""
+    config = current_app.config
+    os.makedirs(config['UPLOAD_FOLDER'], exist_ok=True)
+    with open(os.path.join(config['UPLOAD_FOLDER'], GC_LOCK_FILE), 'a') as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+
+        stats = collect_garbage(
+            min_age=config['STORAGE_GC_MIN_AGE'],
+            quarantine=config['STORAGE_GC_QUARANTINE']
+        )
+        if stats['removed']:
+            current_app.logger.info(
+                f"Storage garbage collection removed {stats['removed']} orphaned files ({stats['bytes']} bytes)"
+            )
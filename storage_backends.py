@@ -0,0 +1,233 @@
+"""
+Storage backends for uploaded files
+
+Files are addressed by a key of the form ``<subfolder>/<filename>``. The
+local backend keeps them under UPLOAD_FOLDER; the S3 backend stores them
+in any S3-compatible bucket (AWS, MinIO, Ceph...), so several app nodes
+can share uploads and serve them from the bucket or a CDN.
+"""
+
+import os
+import uuid
+import shutil
+import mimetypes
+from datetime import timezone
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+
+# Prefix of the files a local save writes before renaming them into place
+TEMP_PREFIX = '.upload-'
+
+class LocalStorage:
+    """Uploads stored in a directory of the app server"""
+
+    def __init__(self, root, base_url='/uploads'):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def local_path(self, key):
+        """Get the filesystem path of a key"""
+        return os.path.join(self.root, *key.split('/'))
+
+    def save(self, key, fileobj):
+        """Write a stream under a key, replacing any existing file atomically"""
+        path = self.local_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = os.path.join(directory, f'{TEMP_PREFIX}{uuid.uuid4().hex}')
+        try:
+            with open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def open(self, key):
+        """Open a stored file for binary reading"""
+        return open(self.local_path(key), 'rb')
+
+    def delete(self, key):
+        """Delete a stored file, ignoring missing ones"""
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        """Check whether a key is stored"""
+        return os.path.isfile(self.local_path(key))
+
+    def size(self, key):
+        """Get the size of a stored file in bytes, or None when missing"""
+        try:
+            return os.path.getsize(self.local_path(key))
+        except OSError:
+            return None
+
+    def move(self, key, new_key):
+        """Rename a stored file"""
+        new_path = self.local_path(new_key)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(self.local_path(key), new_path)
+
+    def list(self, prefix):
+        """Yield (filename, size, mtime) for every file directly under a folder"""
+        try:
+            entries = os.scandir(self.local_path(prefix))
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    info = entry.stat(follow_symlinks=False)
+                    yield entry.name, info.st_size, info.st_mtime
+
+    def url(self, key):
+        """Get the public URL of a key"""
+        return f'{self.base_url}/{key}'
+
+    def signed_url(self, key, expires_in=3600):
+        """Local files are served by the application itself"""
+        return None
+
+class S3Storage:
+    """Uploads stored in an S3-compatible bucket
+
+    endpoint_url points at a non-AWS service such as MinIO, which also makes
+    a local stand-in for development. With public_url (bucket website or
+    CDN) pages link to the bucket directly; otherwise /uploads redirects to
+    short-lived signed URLs.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None,
+                 access_key=None, secret_key=None, public_url=None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key
+        )
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.base_url = (public_url or '/uploads').rstrip('/')
+        self.serves_directly = bool(public_url)
+
+    def _object_key(self, key):
+        """Get the bucket key of a storage key"""
+        return f'{self.prefix}{key}'
+
+    def _is_missing(self, error):
+        """Check whether a client error means the object does not exist"""
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def local_path(self, key):
+        """Objects have no local path"""
+        return None
+
+    def save(self, key, fileobj):
+        """Upload a stream under a key, in parts for large files"""
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        self.client.upload_fileobj(
+            fileobj, self.bucket, self._object_key(key),
+            ExtraArgs={
+                'ContentType': content_type,
+                # Keys are content hashes: the object never changes
+                'CacheControl': 'public, max-age=31536000, immutable'
+            }
+        )
+
+    def open(self, key):
+        """Open a stored object as a readable stream"""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        except ClientError as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(key)
+            raise
+
+    def delete(self, key):
+        """Delete a stored object (deleting a missing key is not an error on S3)"""
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def _head(self, key):
+        """Get the metadata of an object, or None when missing"""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+
+    def exists(self, key):
+        """Check whether a key is stored"""
+        return self._head(key) is not None
+
+    def size(self, key):
+        """Get the size of a stored object in bytes, or None when missing"""
+        head = self._head(key)
+        return head['ContentLength'] if head else None
+
+    def move(self, key, new_key):
+        """Rename a stored object (server-side copy, then delete)"""
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._object_key(new_key),
+            CopySource={'Bucket': self.bucket, 'Key': self._object_key(key)}
+        )
+        self.delete(key)
+
+    def list(self, prefix):
+        """Yield (filename, size, mtime) for every object directly under a folder, page by page"""
+        folder = self._object_key(prefix.strip('/') + '/')
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=folder, Delimiter='/'):
+            for item in page.get('Contents', ()):
+                modified = item['LastModified'].replace(tzinfo=item['LastModified'].tzinfo or timezone.utc)
+                yield item['Key'][len(folder):], item['Size'], modified.timestamp()
+
+    def url(self, key):
+        """Get the public URL of a key"""
+        return f'{self.base_url}/{key}'
+
+    def signed_url(self, key, expires_in=3600):
+        """Get a temporary download URL for a private bucket"""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self._object_key(key)},
+            ExpiresIn=expires_in
+        )
+
+def create_storage(config):
+    """Create the storage backend selected by STORAGE_BACKEND"""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        return S3Storage(
+            bucket=config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX') or '',
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key=config.get('S3_ACCESS_KEY_ID'),
+            secret_key=config.get('S3_SECRET_ACCESS_KEY'),
+            public_url=config.get('S3_PUBLIC_URL')
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+def get_storage():
+    """Get the storage backend of the current application, creating it on first use"""
+    storage = current_app.extensions.get('upload_storage')
+    if storage is None:
+        storage = current_app.extensions['upload_storage'] = create_storage(current_app.config)
+    return storage
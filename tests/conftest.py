@@ -0,0 +1,59 @@
+"""
+Shared test setup for the Marseille Immobilier application
+
+The application is imported once, against a throwaway SQLite database.
+Pages render with the project templates when they are present, and with
+the minimal templates below otherwise; the listing one touches each
+agency's plan and images like the real cards do.
+"""
+
+import os
+import sys
+import tempfile
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Must be set before the application module is imported
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='marseille-tests-'), 'test.db')}")
+os.environ.setdefault('BACKGROUND_WORKERS', '0')
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+AGENCY_CARDS_TEMPLATE = (
+    '{% for agency in agencies %}'
+    '{{ agency.name }}|{{ agency.plan.name if agency.plan }}|{{ agency.images|length }}\n'
+    '{% endfor %}'
+)
+
+FALLBACK_TEMPLATES = {
+    'index.html': AGENCY_CARDS_TEMPLATE,
+    'admin/agencies.html': AGENCY_CARDS_TEMPLATE,
+}
+
+def use_fallback_templates(app):
+    """Let templates missing from the checkout resolve to FALLBACK_TEMPLATES"""
+    app.jinja_env.loader = ChoiceLoader([app.jinja_env.loader, DictLoader(FALLBACK_TEMPLATES)])
+
+@pytest.fixture(scope='session')
+def app():
+    """The application, initialized against the test database"""
+    from main import app
+
+    use_fallback_templates(app)
+    return app
+
+@pytest.fixture
+def client(app):
+    """A test client for anonymous visitors"""
+    return app.test_client()
+
+@pytest.fixture
+def admin_client(app):
+    """A test client logged in as the default admin"""
+    client = app.test_client()
+    client.post('/admin/login', data={'username': 'admin', 'password': 'ChangeMe123!'})
+    return client
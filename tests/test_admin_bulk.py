@@ -0,0 +1,102 @@
+"""
+Tests for the admin bulk operations on agencies and contact messages
+"""
+
+import pytest
+
+MALFORMED_BODIES = ['[1, 2]', '"delete"', '7', 'null', '{not json']
+
+@pytest.fixture
+def agency_ids(app):
+    """Three throwaway agencies, removed afterwards if still present"""
+    from app import db
+    from models import Agency
+
+    with app.app_context():
+        agencies = [
+            Agency(name=f'Bulk Agency {index}', city='Marseille', website='https://example.com', is_active=True)
+            for index in range(3)
+        ]
+        db.session.add_all(agencies)
+        db.session.commit()
+        ids = [agency.id for agency in agencies]
+
+    yield ids
+
+    with app.app_context():
+        db.session.execute(db.delete(Agency).where(Agency.id.in_(ids)))
+        db.session.commit()
+
+@pytest.fixture
+def message_ids(app):
+    """Three unread contact messages, removed afterwards if still present"""
+    from app import db
+    from models import ContactMessage
+
+    with app.app_context():
+        messages = [
+            ContactMessage(name='Visitor', email='visitor@example.com', subject='Hello', message='Hi')
+            for _ in range(3)
+        ]
+        db.session.add_all(messages)
+        db.session.commit()
+        ids = [message.id for message in messages]
+
+    yield ids
+
+    with app.app_context():
+        db.session.execute(db.delete(ContactMessage).where(ContactMessage.id.in_(ids)))
+        db.session.commit()
+
+def _existing_agencies(app, ids):
+    from app import db
+    from models import Agency
+
+    with app.app_context():
+        return db.session.execute(db.select(db.func.count()).where(Agency.id.in_(ids))).scalar()
+
+@pytest.mark.parametrize('path', ['/admin/agencies/bulk', '/admin/messages/bulk'])
+@pytest.mark.parametrize('body', MALFORMED_BODIES)
+def test_bulk_rejects_non_object_bodies(admin_client, path, body):
+    response = admin_client.post(path, data=body, content_type='application/json')
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('ids', ['123', [True], [1.5], [None], ['1a'], {'1': 1}])
+def test_bulk_agencies_rejects_malformed_ids(app, admin_client, agency_ids, ids):
+    response = admin_client.post('/admin/agencies/bulk', json={'action': 'delete', 'agency_ids': ids})
+    assert response.status_code == 400
+    assert _existing_agencies(app, agency_ids) == 3
+
+def test_bulk_agencies_rejects_string_ids_without_deleting(app, admin_client, agency_ids):
+    digits = ''.join(str(agency_id) for agency_id in agency_ids[:2])
+    response = admin_client.post('/admin/agencies/bulk', json={'action': 'delete', 'agency_ids': digits})
+    assert response.status_code == 400
+    assert _existing_agencies(app, agency_ids) == 3
+
+def test_bulk_agencies_deletes_listed_agencies(app, admin_client, agency_ids):
+    response = admin_client.post('/admin/agencies/bulk', json={'action': 'delete', 'agency_ids': agency_ids[:2]})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'success', 'count': 2}
+    assert _existing_agencies(app, agency_ids) == 1
+
+@pytest.mark.parametrize('ids', ['12', [True], [False], [2.0]])
+def test_bulk_messages_rejects_malformed_ids(app, admin_client, message_ids, ids):
+    from models import ContactMessage
+
+    response = admin_client.post('/admin/messages/bulk', json={'action': 'mark_read', 'message_ids': ids})
+    assert response.status_code == 400
+    with app.app_context():
+        assert ContactMessage.query.filter(ContactMessage.id.in_(message_ids), ContactMessage.is_read == True).count() == 0
+
+def test_bulk_messages_marks_listed_messages_read(app, admin_client, message_ids):
+    from models import ContactMessage
+
+    response = admin_client.post('/admin/messages/bulk', json={'action': 'mark_read', 'message_ids': message_ids})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 3
+    with app.app_context():
+        assert ContactMessage.query.filter(ContactMessage.id.in_(message_ids), ContactMessage.is_read == True).count() == 3
+
+def test_bulk_requires_login(client):
+    response = client.post('/admin/agencies/bulk', json={'action': 'delete', 'agency_ids': [1]})
+    assert response.status_code == 302
@@ -0,0 +1,87 @@
+"""
+Tests for the number of queries behind agency listings
+"""
+
+import pytest
+from sqlalchemy import event
+
+IMAGES_PER_AGENCY = 2
+
+@pytest.fixture
+def agencies(app):
+    """Grow the active agencies to a given count, each with gallery images, removing them afterwards"""
+    from app import db
+    from cache import invalidate_pages
+    from models import Agency, AgencyImage, Plan
+
+    added = []
+
+    def grow_to(count):
+        with app.app_context():
+            plans = Plan.query.order_by(Plan.id).all()
+            existing = Agency.query.filter_by(is_active=True).count()
+            assert existing <= count
+            for index in range(existing, count):
+                agency = Agency(name=f'Listing Agency {index}', city='Marseille', website='https://example.com',
+                                plan_id=plans[index % len(plans)].id, is_active=True, sort_order=index)
+                agency.images = [
+                    AgencyImage(image_filename=f'listing-{index}-{number}.jpg', sort_order=number)
+                    for number in range(IMAGES_PER_AGENCY)
+                ]
+                db.session.add(agency)
+                db.session.flush()
+                added.append(agency.id)
+            db.session.commit()
+            invalidate_pages()
+
+    yield grow_to
+
+    with app.app_context():
+        for agency_id in added:
+            db.session.delete(db.session.get(Agency, agency_id))
+        db.session.commit()
+        invalidate_pages()
+
+def count_selects(app, client, path):
+    """Request a page with an empty page cache and count the SELECT statements it runs"""
+    from app import db
+    from cache import invalidate_pages
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    with app.app_context():
+        invalidate_pages()
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return len(statements), response.get_data(as_text=True)
+
+def test_homepage_selects_do_not_grow_with_agencies(app, client, agencies):
+    agencies(4)
+    few, body = count_selects(app, client, '/')
+    assert body.count('\n') == 4
+
+    agencies(40)
+    many, body = count_selects(app, client, '/')
+    assert body.count('\n') > 4
+    assert f'|{IMAGES_PER_AGENCY}\n' in body
+
+    assert many == few
+
+def test_admin_agency_list_selects_do_not_grow_with_agencies(app, admin_client, agencies):
+    agencies(4)
+    few, body = count_selects(app, admin_client, '/admin/agencies')
+
+    agencies(40)
+    many, body = count_selects(app, admin_client, '/admin/agencies')
+    assert body.count('\n') == 40
+
+    assert many == few
@@ -0,0 +1,78 @@
+"""
+Tests for page cache invalidation across worker processes
+"""
+
+import os
+import sys
+import subprocess
+from conftest import ROOT_DIR, TESTS_DIR
+
+# A second worker process serving the homepage from its own page cache.
+# Each line read on stdin is a request; it answers with the agency line of
+# the page, or 'missing' when the agency is not listed.
+WORKER_SCRIPT = r'''
+import sys
+sys.path[:0] = [sys.argv[1], sys.argv[2]]
+from conftest import use_fallback_templates
+from main import app
+
+use_fallback_templates(app)
+client = app.test_client()
+print('ready', flush=True)
+for marker in sys.stdin:
+    marker = marker.strip()
+    body = client.get('/').get_data(as_text=True)
+    lines = [line for line in body.splitlines() if marker in line]
+    print(lines[0] if lines else 'missing', flush=True)
+'''
+
+def _start_worker():
+    env = dict(os.environ, CACHE_GENERATION_CHECK_INTERVAL='0')
+    worker = subprocess.Popen(
+        [sys.executable, '-c', WORKER_SCRIPT, ROOT_DIR, TESTS_DIR],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, cwd=ROOT_DIR, env=env
+    )
+    assert worker.stdout.readline().strip() == 'ready'
+    return worker
+
+def _ask(worker, marker):
+    worker.stdin.write(marker + '\n')
+    worker.stdin.flush()
+    return worker.stdout.readline().strip()
+
+def test_invalidation_reaches_other_processes(app):
+    from app import db
+    from cache import invalidate_pages
+    from models import Agency, Plan
+
+    with app.app_context():
+        plan = Plan.query.order_by(Plan.tier.desc(), Plan.id.desc()).first()
+        agency = Agency(name='Cross Worker Agency', city='Marseille', website='https://example.com',
+                        plan_id=plan.id, is_active=True, sort_order=-10 ** 6)
+        db.session.add(agency)
+        db.session.commit()
+        invalidate_pages()
+        agency_id, plan_name = agency.id, plan.name
+
+    worker = _start_worker()
+    try:
+        assert _ask(worker, 'Cross Worker Agency').startswith('Cross Worker Agency|')
+
+        # Written without invalidation: the other worker keeps its cached page
+        with app.app_context():
+            db.session.get(Agency, agency_id).name = 'Cross Worker Agency (renamed)'
+            db.session.commit()
+        assert _ask(worker, 'Cross Worker Agency') == f'Cross Worker Agency|{plan_name}|0'
+
+        # Bumping the generation here drops the page in the other process
+        with app.app_context():
+            invalidate_pages()
+        assert _ask(worker, 'Cross Worker Agency').startswith('Cross Worker Agency (renamed)|')
+    finally:
+        worker.stdin.close()
+        worker.wait(timeout=30)
+        with app.app_context():
+            db.session.delete(db.session.get(Agency, agency_id))
+            db.session.commit()
+            invalidate_pages()
@@ -0,0 +1,79 @@
+"""
+Tests for the in-memory translation catalog
+"""
+
+import os
+import json
+import pytest
+from flask import render_template_string
+import i18n
+
+TEMPLATE = "{{ get_translation('nav_home', current_language) }} {{ available_languages|join(',') }}"
+
+@pytest.fixture
+def translations_dir(tmp_path, monkeypatch):
+    """A translations directory holding French and English files"""
+    for language, home in (('fr', 'Accueil'), ('en', 'Home')):
+        (tmp_path / f'{language}.json').write_text(json.dumps({'nav_home': home}), encoding='utf-8')
+    monkeypatch.setattr(i18n, 'TRANSLATIONS_DIR', str(tmp_path))
+    monkeypatch.setattr(i18n, 'BUNDLE_FILE', str(tmp_path / 'catalog.bundle'))
+    i18n.clear_catalog()
+    yield tmp_path
+    i18n.clear_catalog()
+
+@pytest.fixture
+def filesystem_calls(monkeypatch):
+    """Count os.stat and os.listdir calls made from now on"""
+    calls = []
+    real_stat, real_listdir = os.stat, os.listdir
+
+    def stat(*args, **kwargs):
+        calls.append(('stat', args[0]))
+        return real_stat(*args, **kwargs)
+
+    def listdir(*args, **kwargs):
+        calls.append(('listdir', args[0] if args else '.'))
+        return real_listdir(*args, **kwargs)
+
+    monkeypatch.setattr(os, 'stat', stat)
+    monkeypatch.setattr(os, 'listdir', listdir)
+    return calls
+
+def test_warm_catalog_renders_without_filesystem_calls(app, translations_dir, monkeypatch, filesystem_calls):
+    monkeypatch.setattr(i18n, 'RELOAD_CHECK_INTERVAL', 3600)
+    with app.test_request_context('/'):
+        # The first render loads the catalog and its source stamp
+        assert render_template_string(TEMPLATE) == 'Accueil en,fr'
+        assert filesystem_calls
+
+        filesystem_calls.clear()
+        for _ in range(20):
+            assert render_template_string(TEMPLATE) == 'Accueil en,fr'
+        assert filesystem_calls == []
+
+def test_catalog_reloads_when_translations_directory_changes(app, translations_dir, monkeypatch):
+    monkeypatch.setattr(i18n, 'RELOAD_CHECK_INTERVAL', 0)
+    with app.test_request_context('/'):
+        assert render_template_string(TEMPLATE) == 'Accueil en,fr'
+
+        (translations_dir / 'es.json').write_text(json.dumps({'nav_home': 'Inicio'}), encoding='utf-8')
+        assert render_template_string(TEMPLATE) == 'Accueil en,es,fr'
+        assert i18n.get_catalog('es')['nav_home'] == 'Inicio'
+
+def test_json_edits_newer_than_the_bundle_take_precedence(app, translations_dir, monkeypatch, caplog):
+    monkeypatch.setattr(i18n, 'RELOAD_CHECK_INTERVAL', 0)
+    i18n.compile_bundle(i18n.read_translation_files(), path=i18n.BUNDLE_FILE)
+    bundle_mtime = os.stat(i18n.BUNDLE_FILE).st_mtime
+    assert i18n.get_catalog('en')['nav_home'] == 'Home'
+
+    english = translations_dir / 'en.json'
+    english.write_text(json.dumps({'nav_home': 'Home page'}), encoding='utf-8')
+    os.utime(english, (bundle_mtime + 10, bundle_mtime + 10))
+    assert i18n.get_catalog('en')['nav_home'] == 'Home page'
+    assert 'compile-translations' in caplog.text
+
+    # Recompiling makes the bundle current again
+    i18n.compile_bundle(i18n.read_translation_files(), path=i18n.BUNDLE_FILE)
+    os.utime(i18n.BUNDLE_FILE, (bundle_mtime + 20, bundle_mtime + 20))
+    assert i18n._source_stamp()[0] == 'bundle'
+    assert i18n.get_catalog('en')['nav_home'] == 'Home page'
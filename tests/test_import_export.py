@@ -0,0 +1,46 @@
+"""
+Tests for the agency CSV export read back by the importer
+"""
+
+import io
+import pytest
+
+FORMULA_NAME = '=HYPERLINK("https://evil.example")'
+FORMULA_DESCRIPTION = "-50% on fees, call +33 4 91 00 00 00"
+QUOTED_CITY = "'Marseille"
+
+@pytest.fixture
+def formula_agency(app):
+    """An agency whose text fields look like spreadsheet formulas, removed afterwards"""
+    from app import db
+    from models import Agency
+
+    with app.app_context():
+        agency = Agency(name=FORMULA_NAME, city=QUOTED_CITY, website='https://example.com',
+                        description=FORMULA_DESCRIPTION, is_active=True)
+        db.session.add(agency)
+        db.session.commit()
+        agency_id = agency.id
+
+    yield agency_id
+
+    with app.app_context():
+        db.session.execute(db.delete(Agency).where(Agency.id == agency_id))
+        db.session.commit()
+
+def test_csv_export_escapes_formulas_and_imports_back_unchanged(app, formula_agency):
+    from exporter import iter_export
+    from importer import iter_rows, validate_row
+
+    with app.app_context():
+        exported = ''.join(iter_export('agencies', 'csv'))
+        assert "'" + FORMULA_NAME.replace('"', '""') in exported
+
+        rows = [row for _, row, error in iter_rows(io.BytesIO(exported.encode('utf-8')), 'csv')
+                if row and row['id'] == str(formula_agency)]
+        values, error = validate_row(rows[0], {})
+
+    assert error is None
+    assert values['name'] == FORMULA_NAME
+    assert values['description'] == FORMULA_DESCRIPTION
+    assert values['city'] == QUOTED_CITY
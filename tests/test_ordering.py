@@ -0,0 +1,41 @@
+"""
+Tests for the admin reorder endpoints
+"""
+
+import pytest
+
+REORDER_PATHS = ['/admin/agencies/reorder', '/admin/carousel/reorder', '/admin/agency/1/images/reorder']
+
+@pytest.mark.parametrize('path', REORDER_PATHS)
+@pytest.mark.parametrize('body', ['[1, 2]', '"123"', 'null', '{}'])
+def test_reorder_rejects_malformed_bodies(admin_client, path, body):
+    response = admin_client.post(path, data=body, content_type='application/json')
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('body', [
+    {'agency_ids': '123'},
+    {'agency_ids': [1, True]},
+    {'agency_ids': [1, 'x']},
+    {'move_id': 'abc'},
+    {'move_id': 1, 'before_id': [2]},
+    {'move_id': False},
+])
+def test_reorder_rejects_malformed_ids(app, admin_client, body):
+    from models import Agency
+
+    with app.app_context():
+        before = [(agency.id, agency.sort_order) for agency in Agency.query.order_by(Agency.id)]
+    response = admin_client.post('/admin/agencies/reorder', json=body)
+    assert response.status_code == 400
+    with app.app_context():
+        assert [(agency.id, agency.sort_order) for agency in Agency.query.order_by(Agency.id)] == before
+
+def test_reorder_moves_one_agency_before_another(app, admin_client):
+    from models import Agency
+
+    with app.app_context():
+        ids = [agency.id for agency in Agency.query.order_by(Agency.sort_order, Agency.id).limit(3)]
+    response = admin_client.post('/admin/agencies/reorder', json={'move_id': ids[2], 'before_id': ids[0]})
+    assert response.status_code == 200
+    with app.app_context():
+        assert [agency.id for agency in Agency.query.order_by(Agency.sort_order, Agency.id).limit(3)] == [ids[2], ids[0], ids[1]]
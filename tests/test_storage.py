@@ -0,0 +1,87 @@
+"""
+Tests for the reference-counted upload storage
+"""
+
+import io
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.datastructures import FileStorage
+
+@pytest.fixture
+def storage(app, tmp_path):
+    """A local storage backend in a temporary directory, used for the test's duration"""
+    from storage_backends import LocalStorage
+
+    previous = app.extensions.get('upload_storage')
+    app.extensions['upload_storage'] = LocalStorage(str(tmp_path))
+    yield app.extensions['upload_storage']
+    if previous is None:
+        app.extensions.pop('upload_storage', None)
+    else:
+        app.extensions['upload_storage'] = previous
+
+def _store(content):
+    from storage import store_file
+
+    return store_file(FileStorage(io.BytesIO(content), filename='video.mp4'), 'carousel')
+
+def test_releasing_the_last_reference_deletes_the_file(app, storage):
+    from app import db
+    from storage import release_reference
+
+    with app.app_context():
+        filename, created = _store(b'released content')
+        db.session.commit()
+        assert created and storage.exists(f'carousel/{filename}')
+
+        release_reference(filename, 'carousel')
+        db.session.commit()
+        assert not storage.exists(f'carousel/{filename}')
+
+def test_file_reused_before_deletion_is_kept(app, storage):
+    from app import db
+    from models import StoredFile
+    from storage import release_reference
+
+    def reuse_concurrently(session):
+        # Another worker reuses the file and commits before the deletion hook runs
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(StoredFile).values(
+                subfolder='carousel', filename=filename, size=len(content), ref_count=1
+            ))
+
+    content = b'reused content'
+    with app.app_context():
+        filename, _ = _store(content)
+        db.session.commit()
+
+        release_reference(filename, 'carousel')
+        event.listen(Session, 'after_commit', reuse_concurrently, insert=True)
+        try:
+            db.session.commit()
+        finally:
+            event.remove(Session, 'after_commit', reuse_concurrently)
+
+        assert storage.exists(f'carousel/{filename}')
+        release_reference(filename, 'carousel')
+        db.session.commit()
+        assert not storage.exists(f'carousel/{filename}')
+
+def test_store_file_counts_the_reference_before_reusing(app, storage):
+    from app import db
+    from models import StoredFile
+
+    with app.app_context():
+        first, created = _store(b'shared content')
+        second, reused = _store(b'shared content')
+        db.session.commit()
+
+        assert first == second and created and not reused
+        stored = db.session.execute(
+            db.select(StoredFile).where(StoredFile.subfolder == 'carousel', StoredFile.filename == first)
+        ).scalar_one()
+        assert stored.ref_count == 2
+
+        db.session.delete(stored)
+        db.session.commit()
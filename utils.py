@@ -1,147 +1,225 @@
-"""
-Utility functions for the Marseille Immobilier application
-"""
-
-import os
-import json
-import uuid
-from flask import current_app
-from flask_mail import Message
-from werkzeug.utils import secure_filename
-# mail is imported at function level to avoid circular imports
-
-def get_translation(key, language='fr'):
-    """Get translation for a given key and language"""
-    try:
-        translations_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations')
-        translation_file = os.path.join(translations_dir, f'{language}.json')
-        
-        if os.path.exists(translation_file):
-            with open(translation_file, 'r', encoding='utf-8') as f:
-                translations = json.load(f)
-                return translations.get(key, key)
-        
-        # Fallback to French if language file doesn't exist
-        if language != 'fr':
-            return get_translation(key, 'fr')
-        
-        return key
-    except Exception as e:
-        current_app.logger.error(f"Error loading translation {key} for {language}: {e}")
-        return key
-
-def get_available_languages():
-    """Get list of available languages"""
-    try:
-        translations_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations')
-        languages = []
-        
-        for filename in os.listdir(translations_dir):
-            if filename.endswith('.json'):
-                lang_code = filename[:-5]  # Remove .json extension
-                languages.append(lang_code)
-        
-        return sorted(languages)
-    except Exception:
-        return ['fr']  # Fallback to French only
-
-def allowed_file(filename):
-    """Check if uploaded file is allowed"""
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp'}
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def allowed_video_file(filename):
-    """Check if uploaded video file is allowed"""
-    ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'webm', 'ogg'}
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
-
-def save_uploaded_file(file, subfolder):
-    """Save uploaded file and return filename"""
-    try:
-        # Create upload directories if they don't exist
-        upload_dir = current_app.config['UPLOAD_FOLDER']
-        subfolder_path = os.path.join(upload_dir, subfolder)
-        
-        os.makedirs(upload_dir, exist_ok=True)
-        os.makedirs(subfolder_path, exist_ok=True)
-        
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        name, ext = os.path.splitext(filename)
-        unique_filename = f"{uuid.uuid4().hex}{ext}"
-        
-        # Save file
-        file_path = os.path.join(subfolder_path, unique_filename)
-        file.save(file_path)
-        
-        return unique_filename
-    except Exception as e:
-        current_app.logger.error(f"Error saving uploaded file: {e}")
-        return None
-
-def send_contact_email(name, email, phone, subject, message):
-    """Send contact form email notification"""
-    try:
-        # Import mail here to avoid circular imports
-        from app import mail
-        
-        # Skip email sending if not properly configured
-        if (current_app.config['MAIL_USERNAME'] == 'your-email@gmail.com' or 
-            current_app.config['MAIL_PASSWORD'] == 'your-app-password'):
-            current_app.logger.info("Email not configured, skipping email send")
-            return True
-        
-        msg = Message(
-            subject=f"[Marseille Immobilier] {subject}",
-            recipients=[current_app.config['MAIL_DEFAULT_SENDER']],
-            reply_to=email
-        )
-        
-        msg.body = f"""
-Nouveau message de contact depuis Marseille Immobilier
-
-Nom: {name}
-Email: {email}
-Téléphone: {phone or 'Non fourni'}
-Sujet: {subject}
-
-Message:
-{message}
-
----
-Ce message a été envoyé depuis le formulaire de contact de Marseille Immobilier.
-        """
-        
-        mail.send(msg)
-        current_app.logger.info(f"Contact email sent for {email}")
-        return True
-        
-    except Exception as e:
-        current_app.logger.error(f"Error sending contact email: {e}")
-        return False
-
-def get_file_url(filename, subfolder):
-    """Get URL for uploaded file"""
-    if not filename:
-        return None
-    return f"/uploads/{subfolder}/{filename}"
-
-def create_directories():
-    """Create required directories if they don't exist"""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    directories = [
-        os.path.join(base_dir, 'uploads'),
-        os.path.join(base_dir, 'uploads', 'logos'),
-        os.path.join(base_dir, 'uploads', 'covers'),
-        os.path.join(base_dir, 'uploads', 'carousel'),
-        os.path.join(base_dir, 'uploads', 'agencies'),
-        os.path.join(base_dir, 'static', 'images'),
-        os.path.join(base_dir, 'translations')
-    ]
-    
-    for directory in directories:
-        os.makedirs(directory, exist_ok=True)
-        current_app.logger.debug(f"Created directory: {directory}")
+"""
+Utility functions for the Marseille Immobilier application
+"""
+
+import os
+from flask import current_app, session
+from flask_mail import Message
+from i18n import get_catalog, get_languages
+from images import VARIANT_WIDTHS, has_variants, variant_filename
+from storage_backends import get_storage
+# mail is imported at function level to avoid circular imports
+
+def parse_id(value):
+    """Get an integer ID from a posted JSON value, raising ValueError if it is not one
+
+    Strings of digits are accepted as well, as sent from DOM data attributes.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid ID: {value!r}")
+    if isinstance(value, str):
+        if not (value.isascii() and value.isdigit()):
+            raise ValueError(f"Invalid ID: {value!r}")
+        value = int(value)
+    return value
+
+def parse_id_list(values):
+    """Get the distinct integer IDs of a posted JSON list, in order
+
+    Raises ValueError when values is not a list or holds anything but IDs.
+    """
+    if not isinstance(values, list):
+        raise ValueError("Expected a list of IDs")
+    ids = []
+    seen = set()
+    for value in values:
+        value = parse_id(value)
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+    return ids
+
+def normalize_website(website):
+    """Strip a website address and default it to https:// when it has no scheme"""
+    website = (website or '').strip()
+    if website and not website.startswith(('http://', 'https://')):
+        website = 'https://' + website
+    return website
+
+def get_translation(key, language='fr'):
+    """Get translation for a given key and language"""
+    try:
+        return get_catalog(language).get(key, key)
+    except Exception as e:
+        current_app.logger.error(f"Error loading translation {key} for {language}: {e}")
+        return key
+
+def get_available_languages():
+    """Get list of available languages"""
+    try:
+        return list(get_languages()) or ['fr']
+    except Exception:
+        return ['fr']  # Fallback to French only
+
+def get_i18n_context():
+    """Get the translation helpers shared by every template"""
+    return {
+        'get_translation': get_translation,
+        'current_language': session.get('language', 'fr'),
+        'available_languages': get_available_languages()
+    }
+
+def allowed_file(filename):
+    """Check if uploaded file is allowed"""
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp'}
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def allowed_video_file(filename):
+    """Check if uploaded video file is allowed"""
+    ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'webm', 'ogg'}
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
+
+def save_uploaded_file(file, subfolder, with_variants=True):
+    """Save uploaded file and return filename
+
+    Files are named after their content, so re-uploading identical content
+    reuses the stored file. The reference is counted in the current
+    transaction. Pass with_variants=False when resized variants are
+    generated later, e.g. by a background job.
+    """
+    # Imported here to avoid circular imports
+    from storage import ensure_variants, store_file
+    
+    try:
+        filename, _ = store_file(file, subfolder)
+        
+        # Resized variants are optional: the original is still served without them.
+        # Identical content stored earlier may lack them, so they are checked too.
+        if with_variants and has_variants(filename, subfolder):
+            try:
+                ensure_variants(filename, subfolder)
+            except Exception as e:
+                current_app.logger.error(f"Error generating variants for {filename}: {e}")
+        
+        return filename
+    except Exception as e:
+        current_app.logger.error(f"Error saving uploaded file: {e}")
+        return None
+
+def send_contact_email(name, email, phone, subject, message):
+    """Send contact form email notification"""
+    try:
+        # Import mail here to avoid circular imports
+        from app import mail
+        
+        # Skip email sending if not properly configured
+        if (current_app.config['MAIL_USERNAME'] == 'your-email@gmail.com' or 
+            current_app.config['MAIL_PASSWORD'] == 'your-app-password'):
+            current_app.logger.info("Email not configured, skipping email send")
+            return True
+        
+        msg = Message(
+            subject=f"[Marseille Immobilier] {subject}",
+            recipients=[current_app.config['MAIL_DEFAULT_SENDER']],
+            reply_to=email
+        )
+        
+        msg.body = f"""
+Nouveau message de contact depuis Marseille Immobilier
+
+Nom: {name}
+Email: {email}
+Téléphone: {phone or 'Non fourni'}
+Sujet: {subject}
+
+Message:
+{message}
+
+---
+Ce message a été envoyé depuis le formulaire de contact de Marseille Immobilier.
+        """
+        
+        mail.send(msg)
+        current_app.logger.info(f"Contact email sent for {email}")
+        return True
+        
+    except Exception as e:
+        current_app.logger.error(f"Error sending contact email: {e}")
+        return False
+
+def get_file_url(filename, subfolder):
+    """Get URL for uploaded file"""
+    if not filename:
+        return None
+    return get_storage().url(f"{subfolder}/{filename}")
+
+def get_srcset(record, subfolder, prefix='image', extension='webp'):
+    """Get the srcset attribute value listing the resized variants of a record's image
+
+    Returns None unless the variants were recorded as stored.
+    """
+    filename = getattr(record, f'{prefix}_filename', None)
+    if not filename or not getattr(record, f'{prefix}_variants', False):
+        return None
+    return ', '.join(
+        f"{get_file_url(variant_filename(filename, width, extension), subfolder)} {width}w"
+        for width in VARIANT_WIDTHS
+    )
+
+def apply_image_metadata(record, filename, subfolder, prefix='image'):
+    """Store the dimensions, dominant color, placeholder and variant availability of an upload on a record"""
+    # Imported here to avoid circular imports
+    from storage import read_stored_image_metadata, set_image_metadata, variants_stored
+    
+    set_image_metadata(record, prefix, read_stored_image_metadata(filename, subfolder))
+    if hasattr(record, f'{prefix}_variants'):
+        setattr(record, f'{prefix}_variants', bool(filename) and variants_stored(filename, subfolder))
+
+def get_placeholder_style(record, prefix='image'):
+    """Get the inline CSS painting an image's placeholder until the image loads"""
+    color = getattr(record, f'{prefix}_color', None)
+    if not color:
+        return None
+    style = f"background-color:{color}"
+    placeholder = getattr(record, f'{prefix}_placeholder', None)
+    if placeholder:
+        style += f";background-image:url({placeholder});background-size:cover;background-position:center"
+    return style
+
+def release_uploaded_file(filename, subfolder):
+    """Drop a reference to an uploaded file
+
+    The file and its variants are deleted once the current transaction
+    commits, if nothing else references them.
+    """
+    # Imported here to avoid circular imports
+    from storage import release_reference
+    
+    release_reference(filename, subfolder)
+
+def release_uploaded_files(files):
+    """Drop one reference per (subfolder, filename) pair with batched statements"""
+    # Imported here to avoid circular imports
+    from storage import release_references
+    
+    release_references(files)
+
+def create_directories():
+    """Create required directories if they don't exist"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    directories = [
+        os.path.join(base_dir, 'uploads'),
+        os.path.join(base_dir, 'uploads', 'logos'),
+        os.path.join(base_dir, 'uploads', 'covers'),
+        os.path.join(base_dir, 'uploads', 'carousel'),
+        os.path.join(base_dir, 'uploads', 'agencies'),
+        os.path.join(base_dir, 'static', 'images'),
+        os.path.join(base_dir, 'translations')
+    ]
+    
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+        current_app.logger.debug(f"Created directory: {directory}")